@@ -1,4 +1,18 @@
-from Autodesk.Revit.DB import BoundingBoxXYZ, XYZ
+from array import array
+from collections import defaultdict, namedtuple
+from itertools import product, repeat
+from math import atan2, floor, sqrt
+try:
+    from Autodesk.Revit.DB import BoundingBoxXYZ, XYZ
+except ImportError:
+    # outside of Revit only the pure python box engines are usable
+    BoundingBoxXYZ = XYZ = None
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MM_FT = 1 / 304.8
 
 
 def get(elem):
@@ -52,37 +66,16 @@ def bbox_xy_zmin_points(bbox):
 
 def get_bbx_from_pts(points):
     """
-    Returns the bbx from a collection of points.
-    :param bbox:
+    Returns the bbx from a collection or generator of points.
+    :param points: iterable of XYZ
     :return: BoundingBox
     """
-    if len(points) < 2:
+    accumulator = BoxAccumulator()
+    accumulator.add_many(points)
+    if accumulator.count < 2:
         print("not enough points for bbx")
         return
-
-    bbox = BoundingBoxXYZ()
-    coord_vals = {
-        "X": set(),
-        "Y": set(),
-        "Z": set(),
-    }
-
-    for pt in points:
-        coord_vals["X"].add(getattr(pt, "X"))
-        coord_vals["Y"].add(getattr(pt, "Y"))
-        coord_vals["Z"].add(getattr(pt, "Z"))
-
-    bbox.Min = XYZ(
-        min(coord_vals["X"]),
-        min(coord_vals["Y"]),
-        min(coord_vals["Z"])
-    )
-    bbox.Max = XYZ(
-        max(coord_vals["X"]),
-        max(coord_vals["Y"]),
-        max(coord_vals["Z"])
-    )
-    return bbox
+    return accumulator.to_bbox()
 
 
 def bbox_offset(bbox, offset):
@@ -204,6 +197,146 @@ def get_bbox_intersection(bbox_a, bbox_b):
         return combined_bbox
 
 
+def overlapping_pairs(boxes, tolerance=0.0, other=None):
+    """
+    Finds all pairs of overlapping boxes in O(n log n + k)
+    by sorting along the longest axis and sweeping,
+    instead of testing every pair with bboxes_overlap.
+    Same semantics as bboxes_overlap (touching is no overlap),
+    boxes closer than a positive tolerance count as overlapping,
+    a negative tolerance requires at least that much overlap.
+    :param boxes: BoxArray or iterable of BoundingBox / six float tuples
+    :param tolerance: float in ft
+    :param other: optional second group of boxes: only pairs across
+                  boxes and other are returned (e.g. voids x walls)
+    :return: sorted list of (index_a, index_b) pairs, index_a < index_b
+             or (index in boxes, index in other) if other is given
+    """
+    coords = _coords_list(boxes)
+    count_a = len(coords)
+    if other is not None:
+        coords.extend(_coords_list(other))
+    if not coords:
+        return []
+
+    spans = [
+        max(bb[axis + 3] for bb in coords) - min(bb[axis] for bb in coords)
+        for axis in range(3)
+    ]
+    axis = spans.index(max(spans))
+    other_axes = [ax for ax in range(3) if ax != axis]
+    ax_b, ax_c = other_axes
+
+    pairs = []
+    active = []
+    for idx in sorted(range(len(coords)), key=lambda i: coords[i][axis]):
+        bb = coords[idx]
+        sweep_min = bb[axis]
+        active = [act for act in active if coords[act][axis + 3] + tolerance > sweep_min]
+        for act in active:
+            if other is not None and (act < count_a) == (idx < count_a):
+                continue
+            act_bb = coords[act]
+            if not act_bb[axis] < bb[axis + 3] + tolerance:
+                continue
+            if not (act_bb[ax_b + 3] + tolerance > bb[ax_b] and act_bb[ax_b] < bb[ax_b + 3] + tolerance):
+                continue
+            if not (act_bb[ax_c + 3] + tolerance > bb[ax_c] and act_bb[ax_c] < bb[ax_c + 3] + tolerance):
+                continue
+            if other is not None:
+                pair = (act, idx - count_a) if act < count_a else (idx, act - count_a)
+            else:
+                pair = (act, idx) if act < idx else (idx, act)
+            pairs.append(pair)
+        active.append(idx)
+    return sorted(pairs)
+
+
+def overlap_metrics(boxes_a, pairs, boxes_b=None):
+    """
+    Calculates intersection volumes and overlap ratios (IoU:
+    intersection volume / union volume) for candidate pairs,
+    e.g. from overlapping_pairs or a SpatialIndex query.
+    Touch-contacts result in volume 0.0.
+    :param boxes_a: BoxArray or iterable of BoundingBox / six float tuples
+    :param pairs: iterable of (index_a, index_b)
+    :param boxes_b: optional second group index_b refers to, defaults to boxes_a
+    :return: tuple: (volumes, ratios) float columns aligned with pairs
+    """
+    boxes_a = _box_array(boxes_a)
+    boxes_b = boxes_a if boxes_b is None else _box_array(boxes_b, use_numpy=boxes_a.use_numpy)
+    pairs = list(pairs)
+    if not pairs:
+        return array("d"), array("d")
+    idx_a = [pair[0] for pair in pairs]
+    idx_b = [pair[1] for pair in pairs]
+    box_a = boxes_a.take(idx_a)
+    box_b = boxes_b.take(idx_b)
+    inter = box_a.intersection(box_b)
+    if box_a.use_numpy:
+        volumes = _volumes(inter, clip=True)
+        union = _volumes(box_a) + _volumes(box_b) - volumes
+        ratios = np.zeros(len(pairs))
+        np.divide(volumes, union, out=ratios, where=union > 0)
+        return volumes, ratios
+    volumes = _volumes(inter, clip=True)
+    ratios = array("d", [
+        vol / (vol_a + vol_b - vol) if vol_a + vol_b - vol > 0 else 0.0
+        for vol, vol_a, vol_b in zip(volumes, _volumes(box_a), _volumes(box_b))
+    ])
+    return volumes, ratios
+
+
+def overlap_matrix(boxes_a, pairs, boxes_b=None, threshold=0.0, metric="ratio"):
+    """
+    Sparse matrix of the pairs whose overlap exceeds threshold.
+    :param boxes_a: BoxArray or iterable of BoundingBox / six float tuples
+    :param pairs: iterable of (index_a, index_b)
+    :param boxes_b: optional second group index_b refers to, defaults to boxes_a
+    :param threshold: minimum value to be kept (exclusive)
+    :param metric: "ratio" (IoU) or "volume"
+    :return: dict of {index_a: {index_b: value}}
+    """
+    pairs = list(pairs)
+    volumes, ratios = overlap_metrics(boxes_a, pairs, boxes_b)
+    values = ratios if metric == "ratio" else volumes
+    matrix = defaultdict(dict)
+    for (index_a, index_b), value in zip(pairs, values):
+        if value > threshold:
+            matrix[index_a][index_b] = float(value)
+    return dict(matrix)
+
+
+def _volumes(boxes, clip=False):
+    x0, y0, z0, x1, y1, z1 = boxes.columns
+    if boxes.use_numpy:
+        dx, dy, dz = x1 - x0, y1 - y0, z1 - z0
+        if clip:
+            dx, dy, dz = np.clip(dx, 0, None), np.clip(dy, 0, None), np.clip(dz, 0, None)
+        return dx * dy * dz
+    if clip:
+        return array("d", [
+            max(a_x1 - a_x0, 0.0) * max(a_y1 - a_y0, 0.0) * max(a_z1 - a_z0, 0.0)
+            for a_x0, a_y0, a_z0, a_x1, a_y1, a_z1 in zip(x0, y0, z0, x1, y1, z1)
+        ])
+    return array("d", [
+        (a_x1 - a_x0) * (a_y1 - a_y0) * (a_z1 - a_z0)
+        for a_x0, a_y0, a_z0, a_x1, a_y1, a_z1 in zip(x0, y0, z0, x1, y1, z1)
+    ])
+
+
+def _box_array(boxes, use_numpy=None):
+    if isinstance(boxes, BoxArray):
+        return boxes
+    return BoxArray.from_bboxes(boxes, use_numpy=use_numpy)
+
+
+def _coords_list(boxes):
+    if isinstance(boxes, BoxArray):
+        return list(boxes)
+    return [bbox_coords(bbox) for bbox in boxes]
+
+
 def bbox_long_edge_is_x_vector(bbox):
     """
     Checks if long edge of bbox is x-vector
@@ -255,3 +388,830 @@ def bbx_min_max_str(bbox):
     )
     return str(coord_tuple)
 
+
+
+def bbox_coords(bbox):
+    """
+    Retrieves Min and Max coordinates of a bbox as flat tuple.
+    :param bbox: BoundingBox or sequence of six floats
+    :return: tuple: (min_x, min_y, min_z, max_x, max_y, max_z)
+    """
+    if isinstance(bbox, AABB):
+        return bbox.coords()
+    if hasattr(bbox, "Min"):
+        bb_min = bbox.Min
+        bb_max = bbox.Max
+        return bb_min.X, bb_min.Y, bb_min.Z, bb_max.X, bb_max.Y, bb_max.Z
+    return tuple(bbox)
+
+
+def coords_to_bbox(coords):
+    """
+    Creates a BoundingBox from a flat coordinate tuple.
+    :param coords: (min_x, min_y, min_z, max_x, max_y, max_z)
+    :return: BoundingBox
+    """
+    bbox = BoundingBoxXYZ()
+    bbox.Min = XYZ(coords[0], coords[1], coords[2])
+    bbox.Max = XYZ(coords[3], coords[4], coords[5])
+    return bbox
+
+
+class BoxArray(object):
+    """
+    Stores N axis aligned boxes as six flat coordinate columns
+    (min_x, min_y, min_z, max_x, max_y, max_z) and runs
+    union, intersection, offset, centroid and overlap on all
+    of them at once. Uses numpy if available, otherwise
+    array module columns (IronPython).
+    Revit objects are only created via to_bbox / to_bboxes.
+    """
+    def __init__(self, columns=None, use_numpy=None):
+        if use_numpy is None:
+            use_numpy = np is not None
+        self.use_numpy = bool(use_numpy and np is not None)
+        if columns is None:
+            columns = [() for _ in range(6)]
+        self.columns = tuple(self._column(values) for values in columns)
+
+    @classmethod
+    def from_bboxes(cls, bboxes, use_numpy=None):
+        """
+        Creates a BoxArray from BoundingBoxes or coordinate tuples.
+        :param bboxes: iterable of BoundingBox or six float sequences
+        :param use_numpy: optional, defaults to numpy if importable
+        :return: BoxArray
+        """
+        columns = [array("d") for _ in range(6)]
+        for bbox in bboxes:
+            for column, coord in zip(columns, bbox_coords(bbox)):
+                column.append(coord)
+        return cls(columns, use_numpy=use_numpy)
+
+    def _column(self, values):
+        if self.use_numpy:
+            return np.array(values, dtype=np.float64)
+        return array("d", values)
+
+    def _new(self, columns):
+        return BoxArray(columns, use_numpy=self.use_numpy)
+
+    def _other_columns(self, other):
+        if isinstance(other, BoxArray):
+            if len(other) != len(self):
+                raise ValueError("BoxArray length mismatch: {} vs {}".format(len(self), len(other)))
+            return other.columns
+        coords = bbox_coords(other)
+        if self.use_numpy:
+            return coords
+        return [repeat(coord, len(self)) for coord in coords]
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def __getitem__(self, index):
+        return tuple(float(column[index]) for column in self.columns)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def mins(self):
+        return self.columns[:3]
+
+    @property
+    def maxs(self):
+        return self.columns[3:]
+
+    def take(self, indices):
+        """
+        Retrieves a BoxArray of the boxes at given indices.
+        :param indices: iterable of ints
+        :return: BoxArray
+        """
+        if self.use_numpy:
+            if not hasattr(indices, "dtype"):
+                indices = list(indices)
+            indices = np.asarray(indices, dtype=np.intp)
+            return self._new([column[indices] for column in self.columns])
+        indices = list(indices)
+        return self._new([[column[i] for i in indices] for column in self.columns])
+
+    def union(self):
+        """
+        Combines all boxes into one union box.
+        :return: tuple: union coordinates or None if empty
+        """
+        if not len(self):
+            return None
+        if self.use_numpy:
+            return (tuple(float(column.min()) for column in self.mins) +
+                    tuple(float(column.max()) for column in self.maxs))
+        return (tuple(min(column) for column in self.mins) +
+                tuple(max(column) for column in self.maxs))
+
+    def offset(self, offset):
+        """
+        Offsets all boxes by an offset value.
+        :param offset: float
+        :return: BoxArray
+        """
+        if self.use_numpy:
+            return self._new([column - offset for column in self.mins] +
+                             [column + offset for column in self.maxs])
+        return self._new([[coord - offset for coord in column] for column in self.mins] +
+                         [[coord + offset for coord in column] for column in self.maxs])
+
+    def centroids(self):
+        """
+        Retrieves the centroids of all boxes.
+        :return: tuple: x, y, z columns
+        """
+        if self.use_numpy:
+            return tuple((col_min + col_max) / 2.0 for col_min, col_max in zip(self.mins, self.maxs))
+        return tuple(
+            array("d", [(c_min + c_max) / 2.0 for c_min, c_max in zip(col_min, col_max)])
+            for col_min, col_max in zip(self.mins, self.maxs)
+        )
+
+    def overlaps(self, other):
+        """
+        Checks per box if it overlaps other, with the same
+        semantics as bboxes_overlap (touching is no overlap).
+        :param other: BoundingBox / coordinate tuple, or BoxArray
+                      of same length for element wise checks
+        :return: bool column
+        """
+        ax0, ay0, az0, ax1, ay1, az1 = self.columns
+        bx0, by0, bz0, bx1, by1, bz1 = self._other_columns(other)
+        if self.use_numpy:
+            return ((ax1 > bx0) & (ax0 < bx1) &
+                    (ay1 > by0) & (ay0 < by1) &
+                    (az1 > bz0) & (az0 < bz1))
+        return [
+            a_x1 > b_x0 and a_x0 < b_x1 and a_y1 > b_y0 and a_y0 < b_y1 and a_z1 > b_z0 and a_z0 < b_z1
+            for a_x0, a_y0, a_z0, a_x1, a_y1, a_z1, b_x0, b_y0, b_z0, b_x1, b_y1, b_z1
+            in zip(ax0, ay0, az0, ax1, ay1, az1, bx0, by0, bz0, bx1, by1, bz1)
+        ]
+
+    def intersection(self, other):
+        """
+        Calculates per box the intersection box with other.
+        Boxes without overlap result in inverted (Min > Max) boxes,
+        use overlaps() to mask them.
+        :param other: BoundingBox / coordinate tuple, or BoxArray
+                      of same length for element wise intersection
+        :return: BoxArray
+        """
+        other_columns = self._other_columns(other)
+        if self.use_numpy:
+            return self._new(
+                [np.maximum(a, b) for a, b in zip(self.mins, other_columns[:3])] +
+                [np.minimum(a, b) for a, b in zip(self.maxs, other_columns[3:])]
+            )
+        return self._new(
+            [[max(a, b) for a, b in zip(col_a, col_b)] for col_a, col_b in zip(self.mins, other_columns[:3])] +
+            [[min(a, b) for a, b in zip(col_a, col_b)] for col_a, col_b in zip(self.maxs, other_columns[3:])]
+        )
+
+    def to_bbox(self, index):
+        """
+        Creates a BoundingBox of the box at index.
+        :param index: int
+        :return: BoundingBox
+        """
+        return coords_to_bbox(self[index])
+
+    def to_bboxes(self):
+        """
+        Creates BoundingBoxes of all boxes.
+        :return: list of BoundingBox
+        """
+        return [coords_to_bbox(coords) for coords in self]
+
+
+def quantized_key(bbox, grid=MM_FT):
+    """
+    Snaps bbox coordinates onto a grid, e.g. 1mm.
+    :param bbox: BoundingBox or six float tuple
+    :param grid: grid size in ft
+    :return: tuple: six grid cell ints
+    """
+    return tuple(int(floor(coord / grid)) for coord in bbox_coords(bbox))
+
+
+class BoxKeyIndex(object):
+    """
+    Identifies bboxes within a tolerance in O(1) per lookup,
+    by hashing quantized coordinates and probing the neighbour
+    cells a coordinate could have drifted into.
+    Replaces exact matching of stringified coordinates,
+    where any float drift makes a box look new.
+    """
+    def __init__(self, grid=MM_FT, tolerance=None):
+        self.grid = grid
+        self.tolerance = grid / 2.0 if tolerance is None else tolerance
+        self.cells = defaultdict(list)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, bbox, item):
+        """
+        Adds an item under the key of its bbox.
+        :param bbox: BoundingBox or six float tuple
+        :param item: e.g. the element placed for this bbox
+        :return:
+        """
+        coords = bbox_coords(bbox)
+        self.cells[quantized_key(coords, self.grid)].append((coords, item))
+        self.count += 1
+
+    def _probe_keys(self, coords):
+        grid = self.grid
+        tolerance = self.tolerance
+        axis_keys = [
+            range(int(floor((coord - tolerance) / grid)), int(floor((coord + tolerance) / grid)) + 1)
+            for coord in coords
+        ]
+        return product(*axis_keys)
+
+    def find_all(self, bbox):
+        """
+        Retrieves all items with every coordinate within tolerance.
+        :param bbox: BoundingBox or six float tuple
+        :return: list of BoxMatch sorted by deviation
+        """
+        coords = bbox_coords(bbox)
+        tolerance = self.tolerance
+        matches = []
+        for key in self._probe_keys(coords):
+            for item_coords, item in self.cells.get(key, ()):
+                deviation = max(abs(a - b) for a, b in zip(coords, item_coords))
+                if deviation <= tolerance:
+                    matches.append(BoxMatch(item, item_coords, deviation))
+        matches.sort(key=lambda match: match.deviation)
+        return matches
+
+    def find(self, bbox):
+        """
+        Retrieves the closest item within tolerance.
+        :param bbox: BoundingBox or six float tuple
+        :return: BoxMatch or None
+        """
+        matches = self.find_all(bbox)
+        if matches:
+            return matches[0]
+
+
+BoxMatch = namedtuple("BoxMatch", "item coords deviation")
+
+
+def convex_hull_xy(points):
+    """
+    Calculates the convex hull of the XY projection of points.
+    :param points: iterable of XYZ or (x, y[, z]) tuples
+    :return: list of (x, y) in counter clockwise order
+    """
+    pts_xy = set()
+    for pt in points:
+        if hasattr(pt, "X"):
+            pts_xy.add((pt.X, pt.Y))
+        else:
+            pts_xy.add((pt[0], pt[1]))
+    pts_xy = sorted(pts_xy)
+    if len(pts_xy) < 3:
+        return pts_xy
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower = []
+    for pt in pts_xy:
+        while len(lower) > 1 and cross(lower[-2], lower[-1], pt) <= 0:
+            lower.pop()
+        lower.append(pt)
+    upper = []
+    for pt in reversed(pts_xy):
+        while len(upper) > 1 and cross(upper[-2], upper[-1], pt) <= 0:
+            upper.pop()
+        upper.append(pt)
+    return lower[:-1] + upper[:-1]
+
+
+class OrientedBox(object):
+    """
+    Box rotated around Z: a rectangle in XY, given by its center,
+    the unit direction of its u axis and half extents along u and v,
+    extruded from min_z to max_z.
+    """
+    def __init__(self, center_x, center_y, dir_x, dir_y, half_u, half_v, min_z, max_z):
+        self.center_x = center_x
+        self.center_y = center_y
+        self.dir_x = dir_x
+        self.dir_y = dir_y
+        self.half_u = half_u
+        self.half_v = half_v
+        self.min_z = min_z
+        self.max_z = max_z
+
+    def __repr__(self):
+        return "OrientedBox(center=({:.4f}, {:.4f}), angle={:.4f}, half=({:.4f}, {:.4f}), z=({:.4f}, {:.4f}))".format(
+            self.center_x, self.center_y, self.angle, self.half_u, self.half_v, self.min_z, self.max_z
+        )
+
+    @property
+    def angle(self):
+        """
+        Rotation of the u axis against X in radians.
+        """
+        return atan2(self.dir_y, self.dir_x)
+
+    def corners_xy(self):
+        """
+        Retrieves the rectangle corners in XY.
+        :return: list of four (x, y) in counter clockwise order
+        """
+        ux, uy = self.dir_x * self.half_u, self.dir_y * self.half_u
+        vx, vy = -self.dir_y * self.half_v, self.dir_x * self.half_v
+        cx, cy = self.center_x, self.center_y
+        return [
+            (cx - ux - vx, cy - uy - vy),
+            (cx + ux - vx, cy + uy - vy),
+            (cx + ux + vx, cy + uy + vy),
+            (cx - ux + vx, cy - uy + vy),
+        ]
+
+    def aabb_coords(self):
+        """
+        Retrieves the axis aligned bbox around the oriented box.
+        :return: tuple: (min_x, min_y, min_z, max_x, max_y, max_z)
+        """
+        ext_x = self.half_u * abs(self.dir_x) + self.half_v * abs(self.dir_y)
+        ext_y = self.half_u * abs(self.dir_y) + self.half_v * abs(self.dir_x)
+        return (
+            self.center_x - ext_x, self.center_y - ext_y, self.min_z,
+            self.center_x + ext_x, self.center_y + ext_y, self.max_z,
+        )
+
+    def overlaps_bbox(self, bbox, tolerance=0.0):
+        """
+        Separating axis test against an axis aligned bbox,
+        touching counts as overlap, boxes closer than a positive
+        tolerance count as overlapping, a negative tolerance
+        requires at least that much overlap.
+        :param bbox: BoundingBox or six float tuple
+        :param tolerance: float in ft
+        :return: bool
+        """
+        x0, y0, z0, x1, y1, z1 = bbox_coords(bbox)
+        if self.min_z > z1 + tolerance or self.max_z < z0 - tolerance:
+            return False
+        a_x0, a_y0, a_z0, a_x1, a_y1, a_z1 = self.aabb_coords()
+        if a_x0 > x1 + tolerance or a_x1 < x0 - tolerance:
+            return False
+        if a_y0 > y1 + tolerance or a_y1 < y0 - tolerance:
+            return False
+        ux, uy = self.dir_x, self.dir_y
+        half_x, half_y = (x1 - x0) / 2.0, (y1 - y0) / 2.0
+        dist_x = (x0 + x1) / 2.0 - self.center_x
+        dist_y = (y0 + y1) / 2.0 - self.center_y
+        radius_u = half_x * abs(ux) + half_y * abs(uy)
+        if abs(dist_x * ux + dist_y * uy) > self.half_u + radius_u + tolerance:
+            return False
+        radius_v = half_x * abs(uy) + half_y * abs(ux)
+        if abs(-dist_x * uy + dist_y * ux) > self.half_v + radius_v + tolerance:
+            return False
+        return True
+
+
+def get_oriented_bbox(points):
+    """
+    Calculates the minimal area oriented box of points:
+    rotating calipers over the convex hull of the XY projection
+    (the minimal rectangle is flush with one hull edge)
+    plus the Z extent of the points.
+    :param points: iterable of XYZ or (x, y, z) tuples
+    :return: OrientedBox or None if no points
+    """
+    points = list(points)
+    if not points:
+        return None
+    z_coords = [pt.Z if hasattr(pt, "Z") else pt[2] for pt in points]
+    hull = convex_hull_xy(points)
+
+    directions = []
+    for idx, pt in enumerate(hull):
+        nxt = hull[(idx + 1) % len(hull)]
+        length = sqrt((nxt[0] - pt[0]) ** 2 + (nxt[1] - pt[1]) ** 2)
+        if length:
+            directions.append(((nxt[0] - pt[0]) / length, (nxt[1] - pt[1]) / length))
+    if not directions:
+        directions.append((1.0, 0.0))
+
+    best = None
+    for ux, uy in directions:
+        proj_u = [x * ux + y * uy for x, y in hull]
+        proj_v = [-x * uy + y * ux for x, y in hull]
+        min_u, max_u = min(proj_u), max(proj_u)
+        min_v, max_v = min(proj_v), max(proj_v)
+        area = (max_u - min_u) * (max_v - min_v)
+        if best is None or area < best[0]:
+            best = (area, ux, uy, min_u, max_u, min_v, max_v)
+
+    area, ux, uy, min_u, max_u, min_v, max_v = best
+    mid_u = (min_u + max_u) / 2.0
+    mid_v = (min_v + max_v) / 2.0
+    return OrientedBox(
+        mid_u * ux - mid_v * uy,
+        mid_u * uy + mid_v * ux,
+        ux, uy,
+        (max_u - min_u) / 2.0,
+        (max_v - min_v) / 2.0,
+        min(z_coords),
+        max(z_coords),
+    )
+
+
+class AABB(object):
+    """
+    Plain python axis aligned bbox of six floats, to keep hot loops
+    in python objects and only materialise Revit geometry when calling
+    the API (to_bbox). Min and Max expose X, Y, Z like BoundingBoxXYZ,
+    so the bbx helpers reading coordinates accept it as well,
+    the methods mirror them without creating Revit objects.
+    """
+    __slots__ = ("min_x", "min_y", "min_z", "max_x", "max_y", "max_z")
+
+    def __init__(self, min_x, min_y, min_z, max_x, max_y, max_z):
+        self.min_x = min_x
+        self.min_y = min_y
+        self.min_z = min_z
+        self.max_x = max_x
+        self.max_y = max_y
+        self.max_z = max_z
+
+    @classmethod
+    def from_bbox(cls, bbox):
+        """
+        Creates an AABB from a BoundingBox or six float tuple.
+        :param bbox:
+        :return: AABB
+        """
+        return cls(*bbox_coords(bbox))
+
+    @classmethod
+    def from_points(cls, points):
+        """
+        Creates the AABB of a collection of points.
+        :param points: iterable of XYZ or (x, y, z) tuples
+        :return: AABB or None if no points
+        """
+        accumulator = BoxAccumulator()
+        accumulator.add_many(points)
+        return accumulator.to_aabb()
+
+    def to_bbox(self):
+        """
+        Creates a Revit BoundingBox of this AABB.
+        :return: BoundingBox
+        """
+        return coords_to_bbox(self.coords())
+
+    def coords(self):
+        return self.min_x, self.min_y, self.min_z, self.max_x, self.max_y, self.max_z
+
+    def __iter__(self):
+        return iter(self.coords())
+
+    def __eq__(self, other):
+        return isinstance(other, AABB) and self.coords() == other.coords()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.coords())
+
+    def __repr__(self):
+        return "AABB{}".format(self.coords())
+
+    @property
+    def Min(self):
+        return Point(self.min_x, self.min_y, self.min_z)
+
+    @property
+    def Max(self):
+        return Point(self.max_x, self.max_y, self.max_z)
+
+    def centroid(self):
+        """
+        Retrieves centroid, see bbox_centroid.
+        :return: Point
+        """
+        return Point(
+            (self.max_x - self.min_x) / 2.0 + self.min_x,
+            (self.max_y - self.min_y) / 2.0 + self.min_y,
+            (self.max_z - self.min_z) / 2.0 + self.min_z,
+        )
+
+    def xy_zmin_points(self):
+        """
+        Retrieves bottom points, see bbox_xy_zmin_points.
+        :return: tuple of Point
+        """
+        min_z = self.min_z
+        return (
+            Point(self.min_x, self.min_y, min_z),
+            Point(self.max_x, self.min_y, min_z),
+            Point(self.max_x, self.max_y, min_z),
+            Point(self.min_x, self.max_y, min_z),
+        )
+
+    def offset(self, offset):
+        """
+        Offsets by an offset value, see bbox_offset.
+        :param offset: float
+        :return: AABB
+        """
+        return AABB(
+            self.min_x - offset, self.min_y - offset, self.min_z - offset,
+            self.max_x + offset, self.max_y + offset, self.max_z + offset,
+        )
+
+    def union(self, *others):
+        """
+        Combines with other boxes, see get_combined_bbox.
+        :param others: AABBs
+        :return: AABB
+        """
+        combined = AABB(*self.coords())
+        for other in others:
+            combined.min_x = min(combined.min_x, other.min_x)
+            combined.min_y = min(combined.min_y, other.min_y)
+            combined.min_z = min(combined.min_z, other.min_z)
+            combined.max_x = max(combined.max_x, other.max_x)
+            combined.max_y = max(combined.max_y, other.max_y)
+            combined.max_z = max(combined.max_z, other.max_z)
+        return combined
+
+    def overlaps(self, other):
+        """
+        Checks overlap, see bboxes_overlap (touching is no overlap).
+        :param other: AABB
+        :return: bool
+        """
+        return (self.max_x > other.min_x and self.min_x < other.max_x and
+                self.max_y > other.min_y and self.min_y < other.max_y and
+                self.max_z > other.min_z and self.min_z < other.max_z)
+
+    def intersection(self, other):
+        """
+        Calculates intersection, see get_bbox_intersection.
+        :param other: AABB
+        :return: AABB or None if they do not overlap
+        """
+        if self.overlaps(other):
+            return AABB(
+                max(self.min_x, other.min_x), max(self.min_y, other.min_y), max(self.min_z, other.min_z),
+                min(self.max_x, other.max_x), min(self.max_y, other.max_y), min(self.max_z, other.max_z),
+            )
+
+    def long_edge_is_x_vector(self):
+        return self.max_x - self.min_x > self.max_y - self.min_y
+
+    def long_edge_is_y_vector(self):
+        return self.max_x - self.min_x < self.max_y - self.min_y
+
+    def edge_length(self, vector):
+        """
+        Returns the length of the edge of the given vector, see bbox_edge_length.
+        :param vector: "x", "y" or "z"
+        :return: float
+        """
+        if vector == "x":
+            return self.max_x - self.min_x
+        elif vector == "y":
+            return self.max_y - self.min_y
+        elif vector == "z":
+            return self.max_z - self.min_z
+
+    def min_max_str(self):
+        """
+        Stringify Min and Max, see bbx_min_max_str.
+        :return: str coordinates
+        """
+        return str(self.coords())
+
+
+Point = namedtuple("Point", "X Y Z")
+
+
+class BoxAccumulator(object):
+    """
+    Incremental bbox of points, taken one by one or as chunks.
+    Keeps only the running extrema, so it works on generators
+    without materialising the points.
+    """
+    __slots__ = ("count", "min_x", "min_y", "min_z", "max_x", "max_y", "max_z")
+
+    def __init__(self):
+        self.count = 0
+        self.min_x = self.min_y = self.min_z = float("inf")
+        self.max_x = self.max_y = self.max_z = float("-inf")
+
+    def add_xyz(self, x, y, z):
+        """
+        Adds a point by its coordinates.
+        :param x: float
+        :param y: float
+        :param z: float
+        :return:
+        """
+        self.count += 1
+        if x < self.min_x:
+            self.min_x = x
+        if x > self.max_x:
+            self.max_x = x
+        if y < self.min_y:
+            self.min_y = y
+        if y > self.max_y:
+            self.max_y = y
+        if z < self.min_z:
+            self.min_z = z
+        if z > self.max_z:
+            self.max_z = z
+
+    def add(self, pt):
+        """
+        Adds a point.
+        :param pt: XYZ or (x, y, z) tuple
+        :return:
+        """
+        if hasattr(pt, "X"):
+            self.add_xyz(pt.X, pt.Y, pt.Z)
+        else:
+            self.add_xyz(pt[0], pt[1], pt[2])
+
+    def add_many(self, points):
+        """
+        Adds points from any iterable, including generators.
+        :param points: iterable of XYZ or (x, y, z) tuples
+        :return:
+        """
+        for pt in points:
+            self.add(pt)
+
+    def add_chunk(self, xs, ys, zs):
+        """
+        Adds a chunk of points given as coordinate columns,
+        using numpy reductions for numpy arrays.
+        :param xs: sequence of floats
+        :param ys: sequence of floats
+        :param zs: sequence of floats
+        :return:
+        """
+        if not len(xs):
+            return
+        self.count += len(xs)
+        self.min_x = min(self.min_x, float(xs.min()) if hasattr(xs, "min") else min(xs))
+        self.max_x = max(self.max_x, float(xs.max()) if hasattr(xs, "max") else max(xs))
+        self.min_y = min(self.min_y, float(ys.min()) if hasattr(ys, "min") else min(ys))
+        self.max_y = max(self.max_y, float(ys.max()) if hasattr(ys, "max") else max(ys))
+        self.min_z = min(self.min_z, float(zs.min()) if hasattr(zs, "min") else min(zs))
+        self.max_z = max(self.max_z, float(zs.max()) if hasattr(zs, "max") else max(zs))
+
+    def coords(self):
+        """
+        Retrieves the accumulated bbox coordinates.
+        :return: tuple or None if no points were added
+        """
+        if self.count:
+            return self.min_x, self.min_y, self.min_z, self.max_x, self.max_y, self.max_z
+
+    def to_aabb(self):
+        """
+        :return: AABB or None if no points were added
+        """
+        if self.count:
+            return AABB(*self.coords())
+
+    def to_bbox(self):
+        """
+        :return: BoundingBox or None if no points were added
+        """
+        if self.count:
+            return coords_to_bbox(self.coords())
+
+
+class BBoxCache(object):
+    """
+    Per run memo of element bboxes keyed by element id int.
+    Entries of elements modified or deleted by a committed transaction
+    are dropped via the DocumentChanged event (watch / unwatch or as
+    context manager), or by passing changed ids to invalidate,
+    e.g. within a still open transaction.
+    Cached bboxes are shared: do not modify them in place.
+    """
+    def __init__(self, doc=None):
+        self.doc = doc
+        self.boxes = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self._app = None
+        self._handler = None
+
+    def __enter__(self):
+        self.watch()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.unwatch()
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __repr__(self):
+        return "BBoxCache(size={}, hits={}, misses={}, invalidated={})".format(
+            len(self.boxes), self.hits, self.misses, self.invalidated
+        )
+
+    def get(self, elem):
+        """
+        Retrieves the bbox for element, queried only once per element
+        until it is invalidated.
+        :param elem:
+        :return: BoundingBoxXYZ
+        """
+        key = elem.Id.IntegerValue
+        if key in self.boxes:
+            self.hits += 1
+            return self.boxes[key]
+        self.misses += 1
+        bbox = elem.get_BoundingBox(None)
+        self.boxes[key] = bbox
+        return bbox
+
+    def invalidate(self, elem_ids):
+        """
+        Drops the entries of given elements.
+        :param elem_ids: iterable of ElementId or int
+        :return:
+        """
+        for elem_id in elem_ids:
+            key = getattr(elem_id, "IntegerValue", elem_id)
+            if key in self.boxes:
+                del self.boxes[key]
+                self.invalidated += 1
+
+    def clear(self):
+        self.boxes.clear()
+
+    def on_document_changed(self, sender, args):
+        """
+        DocumentChanged event handler dropping modified and deleted elements.
+        """
+        if self.doc and not args.GetDocument().Equals(self.doc):
+            return
+        self.invalidate(args.GetModifiedElementIds())
+        self.invalidate(args.GetDeletedElementIds())
+
+    def watch(self, app=None):
+        """
+        Subscribes to DocumentChanged of the application.
+        Call unwatch when done.
+        :param app: optional, defaults to the application of doc
+        :return:
+        """
+        if self._handler:
+            return
+        self._app = app or self.doc.Application
+        self._handler = self.on_document_changed
+        self._app.DocumentChanged += self._handler
+
+    def unwatch(self):
+        """
+        Unsubscribes from DocumentChanged.
+        :return:
+        """
+        if self._handler:
+            self._app.DocumentChanged -= self._handler
+            self._handler = None
+            self._app = None
+
+    def stats(self):
+        """
+        Retrieves cache counters.
+        :return: dict
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.boxes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidated": self.invalidated,
+            "hit_ratio": float(self.hits) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,63 @@
+"""
+Small json file cache for data that is expensive to collect
+but stable between sessions, e.g. per Revit version and language.
+"""
+import json
+import os
+import tempfile
+
+
+def get_cache_dir():
+    """
+    Retrieves the rph cache directory, created if missing.
+    Uses %APPDATA%/rph, falls back to the temp dir.
+    :return: str: path
+    """
+    base_dir = os.environ.get("APPDATA") or tempfile.gettempdir()
+    cache_dir = os.path.join(base_dir, "rph")
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    return cache_dir
+
+
+def get_cache_path(name):
+    """
+    Retrieves the path of a cache file.
+    :param name: file name
+    :return: str: path
+    """
+    return os.path.join(get_cache_dir(), name)
+
+
+def load_json(name):
+    """
+    Loads a json cache file.
+    :param name: file name
+    :return: the loaded data or None if missing or unreadable
+    """
+    path = get_cache_path(name)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as cache_file:
+            return json.load(cache_file)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def save_json(name, data):
+    """
+    Writes data to a json cache file, replacing it
+    only once completely written.
+    :param name: file name
+    :param data: json serializable data
+    :return: str: path
+    """
+    path = get_cache_path(name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as cache_file:
+        json.dump(data, cache_file, indent=1, sort_keys=True)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tmp_path, path)
+    return path
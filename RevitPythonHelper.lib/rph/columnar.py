@@ -0,0 +1,265 @@
+"""
+Compressed columnar file format for tabular dumps, e.g. of data_dump.
+Rows are cut into chunks of chunk_rows, every column chunk is
+encoded on its own and zlib compressed:
+int   - all values are ints written back identically: little endian int64
+float - all values are floats written back identically: little endian float64
+dict  - anything else: json list of the distinct strings + uint32 codes
+A column whose chunks got different kinds is of kind dict,
+its number chunks are read back as their original strings.
+Layout: MAGIC, column chunks, json footer index, footer offset (uint64), MAGIC.
+Readers seek (or mmap) to single column chunks and decode only those.
+Columns are addressed by position, header names may repeat,
+e.g. an instance and a type parameter of the same name in a wide dump.
+"""
+import json
+import struct
+import zlib
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+
+class ColumnarWriter(object):
+    """
+    Writes rows column wise into a columnar file,
+    with the write_rows / rows / close interface of the dump sinks.
+    """
+    def __init__(self, path, header, chunk_rows=65536, level=6):
+        self.path = path
+        self.header = list(header)
+        self.chunk_rows = chunk_rows
+        self.level = level
+        self.rows = 0
+        self._columns = [[] for name in self.header]
+        self._chunks = [[] for name in self.header]
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+
+    def write(self, row):
+        for column, value in zip(self._columns, row):
+            column.append(value)
+        self.rows += 1
+        if len(self._columns[0]) >= self.chunk_rows:
+            self.flush()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        """
+        Encodes and writes the buffered chunk of every column.
+        :return:
+        """
+        if not self._columns or not self._columns[0]:
+            return
+        for idx, values in enumerate(self._columns):
+            kind, payload = encode_chunk(values)
+            payload = zlib.compress(payload, self.level)
+            self._chunks[idx].append([kind, self._file.tell(), len(payload), len(values)])
+            self._file.write(payload)
+        self._columns = [[] for name in self.header]
+
+    def close(self):
+        self.flush()
+        footer = json.dumps({
+            "version": VERSION,
+            "rows": self.rows,
+            "columns": [
+                {"name": name, "kind": column_kind(chunks), "chunks": chunks}
+                for name, chunks in zip(self.header, self._chunks)
+            ],
+        }).encode("utf-8")
+        footer_offset = self._file.tell()
+        self._file.write(footer)
+        self._file.write(struct.pack("<Q", footer_offset))
+        self._file.write(MAGIC)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class ColumnarReader(object):
+    """
+    Reads single columns of a columnar file on demand,
+    memory mapped if mmap is available.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = None
+        if mmap:
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, EnvironmentError):
+                self._map = None
+        trailer_size = 8 + len(MAGIC)
+        self._file.seek(0, 2)
+        file_size = self._file.tell()
+        trailer = self._read(file_size - trailer_size, trailer_size)
+        if trailer[8:] != MAGIC or self._read(0, len(MAGIC)) != MAGIC:
+            raise ValueError("not a columnar file: {}".format(path))
+        footer_offset = struct.unpack("<Q", trailer[:8])[0]
+        footer = json.loads(self._read(footer_offset, file_size - trailer_size - footer_offset).decode("utf-8"))
+        self.rows = footer["rows"]
+        self.columns = [column["name"] for column in footer["columns"]]
+        self._chunks = [column["chunks"] for column in footer["columns"]]
+        self.kinds = [column["kind"] for column in footer["columns"]]
+
+    def _read(self, offset, length):
+        if self._map is not None:
+            return self._map[offset:offset + length]
+        self._file.seek(offset)
+        return self._file.read(length)
+
+    def index(self, column):
+        """
+        :param column: column position or unique column name
+        :return: int: column position
+        """
+        if isinstance(column, int):
+            if not -len(self.columns) <= column < len(self.columns):
+                raise IndexError("no column {} in {}".format(column, self.path))
+            return column % len(self.columns)
+        positions = [idx for idx, name in enumerate(self.columns) if name == column]
+        if not positions:
+            raise KeyError("no column {} in {}".format(column, self.path))
+        if len(positions) > 1:
+            raise ValueError("column name {} is ambiguous in {}, positions: {}".format(column, self.path, positions))
+        return positions[0]
+
+    def iter_column(self, column):
+        """
+        Yields the values of a column chunk by chunk,
+        all of the kind of the column.
+        :param column: column position or unique column name
+        :return: generator of str, int or float values
+        """
+        idx = self.index(column)
+        column_kind = self.kinds[idx]
+        for kind, offset, length, count in self._chunks[idx]:
+            values = decode_chunk(kind, zlib.decompress(self._read(offset, length)), count)
+            if kind != column_kind:
+                values = [number_text(value) for value in values]
+            for value in values:
+                yield value
+
+    def column(self, column):
+        """
+        :param column: column position or unique column name
+        :return: list of the column values
+        """
+        return list(self.iter_column(column))
+
+    def read(self, columns=None):
+        """
+        :param columns: optional column positions or unique names, defaults to all
+        :return: list of value lists, in the order of columns
+        """
+        if columns is None:
+            columns = range(len(self.columns))
+        return [self.column(column) for column in columns]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+def encode_chunk(values):
+    """
+    Encodes a column chunk with the most compact lossless kind.
+    :param values: list of str
+    :return: tuple: kind, payload bytes
+    """
+    numbers = _as_numbers(values, int)
+    if numbers is not None:
+        return "int", struct.pack("<{}q".format(len(numbers)), *numbers)
+    numbers = _as_numbers(values, float)
+    if numbers is not None:
+        return "float", struct.pack("<{}d".format(len(numbers)), *numbers)
+    codes = {}
+    dictionary = []
+    encoded = []
+    for value in values:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(dictionary)
+            dictionary.append(value)
+        encoded.append(code)
+    dictionary = json.dumps(dictionary).encode("utf-8")
+    return "dict", struct.pack("<I", len(dictionary)) + dictionary + struct.pack("<{}I".format(len(encoded)), *encoded)
+
+
+def decode_chunk(kind, payload, count):
+    """
+    :param kind: "int", "float" or "dict"
+    :param payload: decompressed bytes
+    :param count: amount of values
+    :return: list of values
+    """
+    if kind == "int":
+        return list(struct.unpack("<{}q".format(count), payload))
+    if kind == "float":
+        return list(struct.unpack("<{}d".format(count), payload))
+    dictionary_size = struct.unpack("<I", payload[:4])[0]
+    dictionary = json.loads(payload[4:4 + dictionary_size].decode("utf-8"))
+    codes = struct.unpack("<{}I".format(count), payload[4 + dictionary_size:])
+    return [dictionary[code] for code in codes]
+
+
+def column_kind(chunks):
+    """
+    :param chunks: footer chunk entries of a column
+    :return: str: the kind shared by all chunks, else "dict"
+    """
+    kinds = {chunk[0] for chunk in chunks}
+    if len(kinds) == 1:
+        return kinds.pop()
+    return "dict"
+
+
+def number_text(number):
+    """
+    Restores the original string of a decoded int or float,
+    encode_chunk only stores numbers whose repr round-trips.
+    :param number: int or float
+    :return: str
+    """
+    if isinstance(number, float):
+        return repr(number)
+    return str(number)
+
+
+def _as_numbers(values, number_type):
+    numbers = []
+    for value in values:
+        try:
+            number = number_type(value)
+        except (TypeError, ValueError):
+            return None
+        if number_type is int and not -INT64_LIMIT <= number < INT64_LIMIT:
+            return None
+        if repr(number) != value:
+            return None
+        numbers.append(number)
+    return numbers
+
+
+MAGIC = b"RPHC1\n"
+VERSION = 2
+INT64_LIMIT = 2 ** 63
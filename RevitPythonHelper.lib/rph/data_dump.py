@@ -3,14 +3,28 @@ import clr
 clr.AddReference("RevitAPI")
 from Autodesk.Revit.DB import FilteredElementCollector as Fec
 from Autodesk.Revit.DB import BuiltInCategory as Bic
-from Autodesk.Revit.DB import ElementId
+from Autodesk.Revit.DB import ElementId, ElementFilter, LogicalOrFilter, BuiltInParameter
+from Autodesk.Revit.DB import ElementParameterFilter, ParameterFilterRuleFactory
+from System.Collections.Generic import List
+import json
 import os
 import re
 from datetime import datetime
+from functools import partial
+from timeit import default_timer
 from collections import defaultdict, OrderedDict
 from pyrevit import script
 from rpw.ui.forms import select_folder
 from rpw import doc
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+from rph import param as rph_param
+from rph import schema
+from rph import columnar
+from rph.sinks import CsvSink, HashingCsvSink, DeltaSink, SqliteSink
+from rph.sinks import delete_stale_rows, load_delta_index, write_json, DELTA_INDEX_NAME, DELTA_MANIFEST_SUFFIX
 
 
 def compile_category_params(elements):
@@ -24,12 +38,12 @@ def compile_category_params(elements):
     return sorted(list(param_names))
 
 
-def collect_param_values(element, parameter_names):
+def collect_param_values(element, parameter_names, formatter=None):
     param_values = OrderedDict()
 
     for param_name in parameter_names:
         param_value = ""
-        param = element.LookupParameter(param_name)
+        param = rph_param.get_param(element, param_name)
 
         if param:
             if param.HasValue:
@@ -40,14 +54,15 @@ def collect_param_values(element, parameter_names):
                         elem_id = param.AsElementId()
                         if not elem_id == ElementId.InvalidElementId:
                             param_value = doc.GetElement(param.AsElementId()).Name
-                elif storage_type == "Integer":
-                    param_value = param.AsValueString()
-                elif storage_type == "Double":
-                    param_value = param.AsValueString()
+                elif storage_type == "Integer" or storage_type == "Double":
+                    if formatter:
+                        param_value = formatter.format(param)
+                    else:
+                        param_value = param.AsValueString()
                 elif storage_type == "String":
                     param_value = param.AsString()
         param_value = param_value or ""
-        param_values[param_name] = param_value.replace("\r\n", "").replace("\n", "").replace("\r", "")
+        param_values[param_name] = re_line_breaks.sub("", param_value)
 
     return param_values
 
@@ -66,19 +81,37 @@ def get_elem_location(element):
         return ""
 
 
-def dump(typed_categories=None, untyped_categories=None, export_path=None, filters=None):
+def dump(typed_categories=None, untyped_categories=None, export_path=None, filters=None, use_schema=True,
+         buffer_size=1000, layout=None, delta=False, backend="csv", chunk_size=None, resume=False):
     """
     Writes element data for chosen categories, ids, location and params to specified csv
     with the possibility to filter: e.g. {'type':{'Type Name':r"^[X][X]_.+"}}
+    Elements are streamed from the collector to the csv, rows are never held per category.
     :param optional list of typed_categories: e.g. [BIC_Doors]
     :param optional list of untyped_categories: e.g. [BIC_Rooms]
     :param export_path: as path string e.g. "c:/temp/rvt_data_dump"
     :param filters: dict of {'inst/type': {'param_name': 'regex_str_for_param_for_elems_to_keep'}}
+    :param use_schema: take columns from the persisted schema registry if bindings are unchanged
+    :param buffer_size: rows buffered before written to csv
+    :param layout: "wide": type values repeated on each instance row, default except for sqlite,
+     "normalized": type values once per type in <category>_types.csv,
+     instance rows reference them by type_id, default and only layout for sqlite
+    :param delta: write only rows added, modified or deleted since the last
+     dump into export_path, tracked by UniqueId and row hash in a sidecar index,
+     csv backend and wide layout only, not resumable
+    :param backend: "csv" or "sqlite": upserts into <model>_data_dump.sqlite in export_path,
+     one table per category, typed categories with normalized <category>_types tables,
+     or "columnar": compressed rph.columnar files per category instead of csv
+    :param chunk_size: process categories in chunks of this many element ids,
+     sorted by id, with a checkpoint written to export_path after each chunk
+    :param resume: continue the checkpointed run in export_path if its settings match:
+     finished categories are skipped, csv and sqlite categories continue after the
+     last finished chunk, keeping their types, other outputs restart the category
     :return:
     """
     output = script.get_output()
-    today = datetime.now().strftime("%Y%m%d")
     today_time = datetime.now().strftime("%Y%m%d_%H%M")
+    layout = check_options(backend, layout, delta, resume)
 
     if not typed_categories and not untyped_categories:
         typed_categories   = typical_typed_categories
@@ -95,83 +128,660 @@ def dump(typed_categories=None, untyped_categories=None, export_path=None, filte
         if not export_path:
             print("please provide a working export dir. aborting.")
             return
-    os.path.join(export_path, "{}_data_dump_{}".format(today, model_name))
     print("exporting to: {}".format(export_path))
     if not os.path.exists(export_path):
         os.makedirs(export_path)
 
+    formatter = rph_param.ValueFormatter(doc)
+    type_cache = rph_param.TypeValueCache(
+        read=lambda elem_type, names: collect_param_values(elem_type, names, formatter)
+    )
+    schema_registry = schema.SchemaRegistry(doc) if use_schema else None
+    row_filter = RowFilter(filters) if filters else None
     exported_instances        = defaultdict(int)
     category_param_names      = defaultdict(list)
     category_type_param_names = defaultdict(list)
     progress = 0
     progress_total = len(categories["typed"]) + len(categories["untyped"])
+    checkpoint_path = os.path.join(export_path, CHECKPOINT_NAME)
+    settings = {
+        "model": model_name,
+        "backend": backend,
+        "layout": layout,
+        "delta": delta,
+        "filters": filters,
+        "chunk_size": chunk_size,
+    }
+    checkpoint = None
+    if resume:
+        checkpoint = load_checkpoint(checkpoint_path, settings)
+        if checkpoint:
+            today_time = checkpoint["run"]
+            chunk_size = checkpoint["settings"]["chunk_size"]
+            print("resuming run {} from checkpoint".format(today_time))
+        else:
+            print("no matching checkpoint found, starting a new run")
+    if chunk_size and not checkpoint:
+        checkpoint = {"run": today_time, "settings": settings, "categories": {}}
+
+    with TARGETS["delta" if delta else backend](export_path, today_time, model_name, buffer_size) as target:
+        for typing in categories:
+            print(40 * "-" + typing)
+            for bic in categories[typing]:
+                progress += 1
+                output.update_progress(progress, progress_total)
+                cat_name = bic.ToString().split("_")[-1]
+                print("__current category: {}".format(cat_name))
+
+                if not collect_elements(bic).GetElementCount():
+                    target.clear(cat_name)
+                    continue
+
+                if schema_registry:
+                    category_param_names[cat_name] = schema_registry.names(cat_name, "instance", collect_elements(bic))
+                else:
+                    category_param_names[cat_name] = compile_category_params(collect_elements(bic))
+
+                type_param_names = None
+                if typing == "typed":
+                    types = collect_elements(bic, element_types=True)
+                    if schema_registry:
+                        category_type_param_names[cat_name] = schema_registry.names(cat_name, "type", types)
+                    else:
+                        category_type_param_names[cat_name] = compile_category_params(types)
+                    type_param_names = category_type_param_names[cat_name]
+
+                normalized = layout == "normalized" and type_param_names is not None
+                if normalized:
+                    header = ["rvt_id", "GUID", "location", "type_id"] + category_param_names[cat_name]
+                else:
+                    header = ["rvt_id", "GUID", "location"] + category_param_names[cat_name] + (type_param_names or [])
+
+                resume_entry = None
+                if checkpoint:
+                    entry = checkpoint["categories"].get(cat_name)
+                    if entry and entry["header"] == header:
+                        if entry["done"]:
+                            exported_instances[cat_name] += entry["rows"]
+                            print("  finished in checkpoint, skipped: {} rows".format(entry["rows"]))
+                            continue
+                        if target.resumable:
+                            resume_entry = entry
+                            print("  resuming after chunk {}".format(entry["chunks"]))
+
+                if row_filter:
+                    row_filter.prepare(bic, formatter)
+
+                if normalized and resume_entry:
+                    # written completely before the first instance chunk
+                    print("  types kept from the interrupted run")
+                elif normalized:
+                    with target.types_sink(cat_name, ["type_id"] + type_param_names) as types_sink:
+                        types_sink.write_rows(iter_type_rows(
+                            collect_elements(bic, element_types=True), type_param_names, type_cache, row_filter,
+                        ))
+                    print("  {} types".format(types_sink.rows))
+
+                instances = row_filter.collect(bic) if row_filter else collect_elements(bic)
+                rows_of = partial(
+                    iter_rows,
+                    param_names=category_param_names[cat_name],
+                    type_param_names=type_param_names,
+                    formatter=formatter,
+                    type_cache=type_cache,
+                    filters=row_filter,
+                    type_ref=normalized,
+                )
+
+                sink = target.sink(cat_name, header, resume_offset=resume_entry["offset"] if resume_entry else None)
+                start = default_timer()
+                resumed_rows = resume_entry["rows"] if resume_entry else 0
+                with sink:
+                    if chunk_size:
+                        entry = {
+                            "header": header,
+                            "chunks": resume_entry["chunks"] if resume_entry else 0,
+                            "rows": resumed_rows,
+                            "offset": resume_entry["offset"] if resume_entry else None,
+                            "done": False,
+                        }
+                        checkpoint["categories"][cat_name] = entry
+                        write_chunks(sink, target, rows_of, instances, chunk_size, entry, checkpoint, checkpoint_path)
+                    else:
+                        sink.write_rows(rows_of(instances))
+                if chunk_size:
+                    entry["rows"] = sink.rows
+                    entry["done"] = True
+                    write_json(checkpoint_path, checkpoint)
+                elapsed = default_timer() - start
+                written_rows = sink.rows - resumed_rows
+                exported_instances[cat_name] += sink.rows
+                print("  {} rows in {:.2f}s: {:.0f} rows/s".format(
+                    written_rows, elapsed, written_rows / elapsed if elapsed else 0.0))
+                target.finish(cat_name, header, sink)
+                print(40 * "-")
 
-    for typing in categories:
-        print(40 * "-" + typing)
-        for bic in categories[typing]:
-            progress += 1
-            output.update_progress(progress, progress_total)
-            cat_name = bic.ToString().split("_")[-1]
-            print("__current category: {}".format(cat_name))
+    if checkpoint and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
 
-            instances = Fec(doc).OfCategory(bic).WhereElementIsNotElementType().ToElements()
-            if not instances:
-                continue
+    print(type_cache)
+    print(formatter)
+    if schema_registry:
+        schema_registry.save()
+        print(schema_registry)
+    return exported_instances
 
-            category_param_names[cat_name] = compile_category_params(instances)
 
-            if typing == "typed":
-                types = Fec(doc).OfCategory(bic).WhereElementIsElementType().ToElements()
-                category_type_param_names[cat_name] = compile_category_params(types)
+def check_options(backend, layout, delta, resume):
+    """
+    Rejects dump option combinations no target supports.
+    :param backend: one of BACKENDS
+    :param layout: one of LAYOUTS or None for the default of the backend
+    :param delta: bool
+    :param resume: bool
+    :return: str: layout
+    """
+    if backend not in BACKENDS:
+        raise ValueError("backend must be one of: {}".format(", ".join(BACKENDS)))
+    if layout is None:
+        layout = "normalized" if backend == "sqlite" else "wide"
+    if layout not in LAYOUTS:
+        raise ValueError("layout must be one of: {}".format(", ".join(LAYOUTS)))
+    if backend == "sqlite":
+        if not sqlite3:
+            raise ImportError("sqlite3 is not available in this python engine")
+        if layout != "normalized":
+            raise ValueError("sqlite dumps are written in the normalized layout only")
+    if delta:
+        if backend != "csv":
+            raise ValueError("delta dumps are written as csv only, sqlite dumps upsert instead")
+        if layout != "wide":
+            raise ValueError("delta dumps are written in the wide layout only")
+        if resume:
+            raise ValueError("delta dumps can not be resumed, the row hashes are kept per run")
+    return layout
+
+
+def write_chunks(sink, target, rows_of, instances, chunk_size, entry, checkpoint, checkpoint_path):
+    """
+    Writes the instances chunk by chunk, skipping the chunks finished
+    according to the checkpoint entry, which is updated and
+    written to checkpoint_path after each chunk.
+    :param sink: sink of the category
+    :param target: DumpTarget of the run
+    :param rows_of: callable from a list of elements to rows
+    :param instances: FilteredElementCollector
+    :param chunk_size: int
+    :param entry: checkpoint entry of the category
+    :param checkpoint: checkpoint dict holding entry
+    :param checkpoint_path:
+    :return:
+    """
+    sink.rows = entry["rows"]
+    for chunk_idx, chunk_ids in enumerate(iter_id_chunks(instances, chunk_size)):
+        if chunk_idx < entry["chunks"]:
+            continue
+        sink.write_rows(rows_of([doc.GetElement(ElementId(elem_id)) for elem_id in chunk_ids]))
+        sink.flush()
+        target.commit()
+        entry["chunks"] = chunk_idx + 1
+        entry["rows"] = sink.rows
+        entry["offset"] = target.resume_offset(sink)
+        write_json(checkpoint_path, checkpoint)
+
+
+def collect_elements(bic, element_types=False):
+    """
+    Retrieves a fresh collector of a category, iterated lazily.
+    :param bic: BuiltInCategory
+    :param element_types: collect types instead of instances
+    :return: FilteredElementCollector
+    """
+    collector = Fec(doc).OfCategory(bic)
+    if element_types:
+        return collector.WhereElementIsElementType()
+    return collector.WhereElementIsNotElementType()
 
-            csv_name = "{}_{}.csv".format(today_time, cat_name)
-            csv_path = os.path.join(export_path, csv_name)
-            with open(csv_path, "w") as cat_csv:
-                print("  writing: {}".format(csv_path))
 
-                header = ";".join([name for name in category_param_names[cat_name]])
-                type_header = ""
-                if typing == "typed":
-                    type_header = ";" + ";".join([name for name in category_type_param_names[cat_name]])
-
-                cat_csv.write("rvt_id;GUID;location;" + header + type_header + "\n")
-
-                for inst in instances:
-                    inst_params_vals = collect_param_values(inst, category_param_names[cat_name])
-                    inst_type = doc.GetElement(inst.GetTypeId())
-                    location = get_elem_location(inst)
-                    ids_loc = "{};{};{};".format(inst.Id.ToString(), inst.UniqueId, location)
-
-                    info_line = ids_loc + ";".join([val for val in inst_params_vals.values()])
-
-                    if typing == "typed":
-                        type_params_vals = collect_param_values(inst_type, category_type_param_names[cat_name])
-                        info_line += ";" + ";".join([val for val in type_params_vals.values()])
-
-                    match = True
-                    if filters:
-                        match = False
-                        if filters.get('type'):
-                            for type_param_name_filter in  filters['type']:
-                                re_param = re.compile(filters['type'][type_param_name_filter])
-                                param_val = type_params_vals[type_param_name_filter]
-                                if re.match(re_param, param_val):
-                                    match = True
-                                    break
-                        elif filters.get('inst'):
-                            for inst_param_name_filter in  filters['inst']:
-                                re_param = re.compile(filters['inst'][inst_param_name_filter])
-                                param_val = inst_params_vals[type_param_name_filter]
-                                if re.match(re_param, param_val):
-                                    match = True
-                                    break
-                    if match:
-                        cat_csv.write(info_line + "\n")
-                        exported_instances[cat_name] += 1
+def iter_rows(instances, param_names, type_param_names=None, formatter=None, type_cache=None, filters=None,
+              type_ref=False):
+    """
+    Yields one row per instance passing the filters:
+    rvt_id, GUID, location, instance values, type values
+    or with type_ref: rvt_id, GUID, location, type_id, instance values.
+    Filter parameters are read and checked before the rest of the row.
+    :param instances: iterable of elements
+    :param param_names: instance parameter names
+    :param type_param_names: type parameter names or None for untyped categories
+    :param formatter: optional rph.param.ValueFormatter
+    :param type_cache: optional rph.param.TypeValueCache reading via collect_param_values
+    :param filters: optional RowFilter prepared for the category
+    :param type_ref: reference the type by id instead of adding its values
+    :return: generator of tuples
+    """
+    for inst in instances:
+        if filters and not filters.instance_passes(inst, formatter):
+            continue
+        inst_params_vals = collect_param_values(inst, param_names, formatter)
+        row = [inst.Id.ToString(), inst.UniqueId, get_elem_location(inst)]
+        if type_ref:
+            row.append(inst.GetTypeId().ToString())
+        row.extend(inst_params_vals.values())
+
+        if type_param_names is not None and not type_ref:
+            inst_type = doc.GetElement(inst.GetTypeId())
+            if type_cache:
+                type_params_vals = type_cache.get(inst_type, type_param_names)
+            else:
+                type_params_vals = collect_param_values(inst_type, type_param_names, formatter)
+            row.extend(type_params_vals.values())
+
+        yield tuple(row)
+
+
+def iter_type_rows(types, type_param_names, type_cache, filters=None):
+    """
+    Yields one row per type: type_id, type values.
+    :param types: iterable of ElementTypes
+    :param type_param_names: type parameter names
+    :param type_cache: rph.param.TypeValueCache reading via collect_param_values
+    :param filters: optional RowFilter, skips types not passing its type rules
+    :return: generator of tuples
+    """
+    for elem_type in types:
+        if filters and not filters.type_passes(elem_type):
+            continue
+        row = [elem_type.Id.ToString()]
+        row.extend(type_cache.get(elem_type, type_param_names).values())
+        yield tuple(row)
 
-                print(40 * "-")
-    return exported_instances
 
+class RowFilter(object):
+    """
+    Compiled dump filters: {'type': {param_name: regex}} or {'inst': {param_name: regex}},
+    an element passes if any regex matches (re.match) its formatted value,
+    type filters take precedence over instance filters.
+    Type filters are evaluated once per type. Literal prefix or
+    equality patterns on text parameters, and the resulting type ids,
+    are pushed into the collector as ElementParameterFilter.
+    """
+    def __init__(self, filters):
+        self.type_rules = [(name, re.compile(pattern)) for name, pattern in filters.get("type", {}).items()]
+        self.inst_rules = []
+        if not self.type_rules:
+            self.inst_rules = [(name, re.compile(pattern)) for name, pattern in filters.get("inst", {}).items()]
+        self.type_ids = None
+
+    def __nonzero__(self):
+        return bool(self.type_rules or self.inst_rules)
+
+    __bool__ = __nonzero__
+
+    def prepare(self, bic, formatter=None):
+        """
+        Evaluates the type rules on the types of a category,
+        before its types or instances are dumped.
+        :param bic: BuiltInCategory
+        :param formatter: optional rph.param.ValueFormatter
+        :return:
+        """
+        self.type_ids = None
+        if self.type_rules:
+            self.type_ids = set()
+            names = [name for name, regex in self.type_rules]
+            for elem_type in collect_elements(bic, element_types=True):
+                if self._passes(self.type_rules, collect_param_values(elem_type, names, formatter)):
+                    self.type_ids.add(elem_type.Id.IntegerValue)
+
+    def collect(self, bic):
+        """
+        Retrieves a collector of the category instances,
+        narrowed by native filters where the rules allow it.
+        Requires prepare for the same category first.
+        :param bic: BuiltInCategory
+        :return: FilteredElementCollector
+        """
+        native_filters = []
+        if self.type_rules:
+            type_param_id = ElementId(BuiltInParameter.ELEM_TYPE_PARAM)
+            native_filters = [
+                ElementParameterFilter(ParameterFilterRuleFactory.CreateEqualsRule(type_param_id, ElementId(type_id)))
+                for type_id in sorted(self.type_ids)
+            ]
+            if not native_filters:
+                # nothing passes, an empty or filter would let everything through
+                native_filters = [ElementParameterFilter(ParameterFilterRuleFactory.CreateEqualsRule(
+                    type_param_id, ElementId.InvalidElementId))]
+        elif self.inst_rules:
+            native_filters = self._native_instance_filters(bic)
+        collector = collect_elements(bic)
+        if len(native_filters) == 1:
+            collector = collector.WherePasses(native_filters[0])
+        elif native_filters:
+            collector = collector.WherePasses(LogicalOrFilter(List[ElementFilter](native_filters)))
+        return collector
+
+    def _native_instance_filters(self, bic):
+        sample = collect_elements(bic).FirstElement()
+        if not sample:
+            return []
+        native_filters = []
+        for name, regex in self.inst_rules:
+            native = native_string_rule(regex.pattern)
+            param = rph_param.get_param(sample, name)
+            if not native or not param or param.StorageType.ToString() != "String":
+                # rules are or-ed, one rule checked in python only
+                # means the collector cannot drop anything
+                return []
+            kind, literal = native
+            rule = create_string_rule(getattr(ParameterFilterRuleFactory, kind), param.Id, literal)
+            native_filters.append(ElementParameterFilter(rule))
+        return native_filters
+
+    def instance_passes(self, inst, formatter=None):
+        """
+        Checks an instance against the prepared type ids or instance rules,
+        reading only the filter parameters.
+        :param inst: Element
+        :param formatter: optional rph.param.ValueFormatter
+        :return: bool
+        """
+        if self.type_rules:
+            return inst.GetTypeId().IntegerValue in self.type_ids
+        if self.inst_rules:
+            names = [name for name, regex in self.inst_rules]
+            return self._passes(self.inst_rules, collect_param_values(inst, names, formatter))
+        return True
+
+    def type_passes(self, elem_type):
+        return self.type_ids is None or elem_type.Id.IntegerValue in self.type_ids
+
+    @staticmethod
+    def _passes(rules, values):
+        for name, regex in rules:
+            if regex.match(values[name]):
+                return True
+        return False
+
+
+def native_string_rule(pattern):
+    """
+    Maps a regex usable with re.match to a native string rule
+    if it is a plain literal, optionally anchored.
+    :param pattern: str
+    :return: tuple: rule factory method name, literal or None
+    """
+    match = re_literal_pattern.match(pattern)
+    if not match or not match.group("literal"):
+        return None
+    if match.group("end"):
+        return "CreateEqualsRule", match.group("literal")
+    return "CreateBeginsWithRule", match.group("literal")
+
+
+def create_string_rule(factory_method, param_id, value):
+    """
+    Creates a case sensitive string rule, the case
+    sensitivity argument was dropped in Revit 2023.
+    """
+    try:
+        return factory_method(param_id, value, True)
+    except TypeError:
+        return factory_method(param_id, value)
+
+
+class DumpTarget(object):
+    """
+    Where a dump run writes its categories, one subclass per backend.
+    Creates the sinks of the categories and is told about
+    empty categories, finished chunks and categories and the end of the run.
+    """
+    extension = ""
+    resumable = False
+
+    def __init__(self, export_path, run, model_name, buffer_size=1000):
+        self.export_path = export_path
+        self.run = run
+        self.model_name = model_name
+        self.buffer_size = buffer_size
+
+    def types_sink(self, cat_name, header):
+        raise NotImplementedError
+
+    def sink(self, cat_name, header, resume_offset=None):
+        """
+        :param cat_name: category name
+        :param header: list of column names
+        :param resume_offset: offset from resume_offset of an interrupted run
+        :return: sink with write_rows, flush, rows and context manager
+        """
+        raise NotImplementedError
+
+    def resume_offset(self, sink):
+        """
+        :param sink: sink of the category after a finished chunk
+        :return: position to continue the sink at on resume, json serializable
+        """
+        return None
+
+    def clear(self, cat_name):
+        """
+        Called for categories without elements.
+        :param cat_name: category name
+        :return:
+        """
+
+    def commit(self):
+        """
+        Called after each checkpointed chunk.
+        :return:
+        """
+
+    def finish(self, cat_name, header, sink):
+        """
+        Called after the instances of a category are written.
+        :return:
+        """
+
+    def close(self):
+        pass
+
+    def abort(self):
+        pass
+
+    def path(self, cat_name, suffix=""):
+        return os.path.join(self.export_path, "{}_{}{}{}".format(self.run, cat_name, suffix, self.extension))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type:
+            self.abort()
+        else:
+            self.close()
+        return False
+
+
+class CsvTarget(DumpTarget):
+    """
+    One <run>_<category>.csv per category,
+    normalized types in <run>_<category>_types.csv.
+    """
+    extension = ".csv"
+    resumable = True
+
+    def types_sink(self, cat_name, header):
+        path = self.path(cat_name, "_types")
+        print("  writing: {}".format(path))
+        return CsvSink(path, header, buffer_size=self.buffer_size)
+
+    def sink(self, cat_name, header, resume_offset=None):
+        path = self.path(cat_name)
+        print("  writing: {}".format(path))
+        return CsvSink(path, header, buffer_size=self.buffer_size, resume_offset=resume_offset)
+
+    def resume_offset(self, sink):
+        return sink.size()
+
+
+class DeltaTarget(CsvTarget):
+    """
+    Csv files with only the rows added, modified or deleted since the
+    last dump into export_path, or a full csv for new categories
+    and changed headers. Writes the manifest of the run and
+    the row hashes for the next run on close.
+    """
+    resumable = False
+
+    def __init__(self, export_path, run, model_name, buffer_size=1000):
+        CsvTarget.__init__(self, export_path, run, model_name, buffer_size)
+        self.index = load_delta_index(export_path)
+        self.manifest = {
+            "run": run,
+            "previous": self.index.get("manifest"),
+            "categories": {},
+        }
+
+    def sink(self, cat_name, header, resume_offset=None):
+        previous = self.index["categories"].get(cat_name)
+        if previous and previous["header"] == header:
+            base_path = self.path(cat_name)[:-len(self.extension)]
+            print("  writing: {}_*{}".format(base_path, self.extension))
+            return DeltaSink(base_path, header, previous["hashes"], buffer_size=self.buffer_size)
+        path = self.path(cat_name)
+        print("  writing: {}".format(path))
+        return HashingCsvSink(path, header, buffer_size=self.buffer_size)
+
+    def clear(self, cat_name):
+        previous = self.index["categories"].pop(cat_name, None)
+        if previous:
+            # all elements deleted since the last dump
+            base_path = self.path(cat_name)[:-len(self.extension)]
+            with DeltaSink(base_path, previous["header"], previous["hashes"], buffer_size=self.buffer_size) as sink:
+                pass
+            self._add_entry(cat_name, sink)
+
+    def finish(self, cat_name, header, sink):
+        self.index["categories"][cat_name] = {"header": header, "hashes": sink.hashes}
+        self._add_entry(cat_name, sink)
+
+    def _add_entry(self, cat_name, sink):
+        entry = sink.manifest_entry()
+        self.manifest["categories"][cat_name] = entry
+        print("  {}".format(entry["counts"]))
+
+    def close(self):
+        manifest_name = "{}_{}".format(self.run, DELTA_MANIFEST_SUFFIX)
+        write_json(os.path.join(self.export_path, manifest_name), self.manifest)
+        self.index["manifest"] = manifest_name
+        write_json(os.path.join(self.export_path, DELTA_INDEX_NAME), self.index)
+        print("delta manifest: {}".format(manifest_name))
+
+
+class ColumnarTarget(DumpTarget):
+    """
+    One compressed <run>_<category>.rphc per category,
+    normalized types in <run>_<category>_types.rphc.
+    """
+    extension = ".rphc"
+
+    def types_sink(self, cat_name, header):
+        path = self.path(cat_name, "_types")
+        print("  writing: {}".format(path))
+        return columnar.ColumnarWriter(path, header)
+
+    def sink(self, cat_name, header, resume_offset=None):
+        path = self.path(cat_name)
+        print("  writing: {}".format(path))
+        return columnar.ColumnarWriter(path, header)
+
+
+class SqliteTarget(DumpTarget):
+    """
+    Upserts into <model>_data_dump.sqlite in export_path, one table
+    per category and <category>_types. Rows of elements no longer
+    in the model are deleted, the run is committed on close.
+    """
+    resumable = True
+
+    def __init__(self, export_path, run, model_name, buffer_size=1000):
+        DumpTarget.__init__(self, export_path, run, model_name, buffer_size)
+        self.db_path = os.path.join(export_path, "{}_data_dump.sqlite".format(os.path.splitext(model_name)[0]))
+        print("writing to: {}".format(self.db_path))
+        self.connection = sqlite3.connect(self.db_path)
+
+    def types_sink(self, cat_name, header):
+        return SqliteSink(
+            self.connection, cat_name + "_types", header, "type_id", buffer_size=self.buffer_size, run=self.run,
+        )
+
+    def sink(self, cat_name, header, resume_offset=None):
+        print("  writing: table {}".format(cat_name))
+        return SqliteSink(self.connection, cat_name, header, "GUID", buffer_size=self.buffer_size, run=self.run)
+
+    def clear(self, cat_name):
+        for table in (cat_name, cat_name + "_types"):
+            delete_stale_rows(self.connection, table, self.run)
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def abort(self):
+        # keeps the state of the last checkpointed chunk
+        self.connection.rollback()
+        self.connection.close()
+
+
+def iter_id_chunks(collector, chunk_size):
+    """
+    Yields the element ids of a collector in chunks sorted by id,
+    so chunk boundaries are stable between runs on the same model.
+    :param collector: FilteredElementCollector
+    :param chunk_size: int
+    :return: generator of lists of element id ints
+    """
+    elem_ids = sorted(elem_id.IntegerValue for elem_id in collector.ToElementIds())
+    for start in range(0, len(elem_ids), chunk_size):
+        yield elem_ids[start:start + chunk_size]
+
+
+def load_checkpoint(checkpoint_path, settings):
+    """
+    Loads the checkpoint of an interrupted chunked dump.
+    :param checkpoint_path:
+    :param settings: dict of the current dump settings, chunk_size None accepts any
+    :return: dict or None if missing or written with other settings
+    """
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path) as checkpoint_file:
+        checkpoint = json.load(checkpoint_file)
+    for key, value in settings.items():
+        if key == "chunk_size" and value is None:
+            continue
+        if json.dumps(checkpoint["settings"].get(key), sort_keys=True) != json.dumps(value, sort_keys=True):
+            print("checkpoint {} differs: {} != {}".format(key, checkpoint["settings"].get(key), value))
+            return None
+    return checkpoint
+
+
+LAYOUTS = ("wide", "normalized")
+re_literal_pattern = re.compile(r"^\^?(?P<literal>[^.^$*+?{}\[\]\\|()]*)(?P<end>\$?)$")
+BACKENDS = ("csv", "sqlite", "columnar")
+CHECKPOINT_NAME = "data_dump_checkpoint.json"
+TARGETS = {
+    "csv": CsvTarget,
+    "delta": DeltaTarget,
+    "columnar": ColumnarTarget,
+    "sqlite": SqliteTarget,
+}
+
+re_line_breaks = re.compile(r"[\r\n]+")
 
 elem_id_clear_value_params = {
     "Level",
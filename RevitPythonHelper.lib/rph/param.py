@@ -1,8 +1,12 @@
 #-*- coding: UTF-8 -*-
 from Autodesk.Revit.DB import BuiltInParameter as Bip
 import re
-from collections import namedtuple
-from rpw import doc, DB
+from array import array
+from decimal import Decimal, ROUND_HALF_UP
+from math import log10
+from collections import defaultdict, OrderedDict
+from rpw import doc, db, DB
+from rph import cache
 
 
 def print_param_mapping(param_dict, title="", verbose=True):
@@ -20,64 +24,394 @@ def print_param_mapping(param_dict, title="", verbose=True):
             print(param_dict[key])
 
 
-def get_info_map(element, verbose=None, name=None, regex=None):
+def get_info_map(element, verbose=None, name=None, regex=None, keep_params=False, type_cache=None):
     """
     Retrieve an overview of parameters of the provided element.
     Prints out the gathered parameter information
     Args:
         element: Element that holds the parameters.
+        name: only parameters with exactly this name
+        regex: only parameters with names matching (re.search)
+        keep_params: hold Parameter objects instead of definitions
+        type_cache: TypeValueCache to collect type parameters once per type
     Returns:
-        Returns two dictionaries: Instance dict, Type dict.
-        If no type is available second dict is None
+        Returns sorted list of ParamInfo of instance and type parameters.
     """
     info_map = []
-    info_map.extend(collect_infos(element))
+    info_map.extend(collect_infos(element, name=name, regex=regex, keep_params=keep_params))
     if "GetTypeId" in dir(element):
         if element.GetTypeId() != DB.ElementId.InvalidElementId:
             elem_type = doc.GetElement(element.GetTypeId())
-            info_map.extend(collect_infos(elem_type, is_type_param=True))
-
-    if name:
-        return sorted(pi for pi in info_map if pi.name == name)
-
-    if regex:
-        re_filter = re.compile(regex)
-        return sorted(pi for pi in info_map if re.match(re_filter, str(pi)))
-
+            if type_cache:
+                info_map.extend(type_cache.get_infos(elem_type, name=name, regex=regex, keep_params=keep_params))
+            else:
+                info_map.extend(collect_infos(
+                    elem_type, is_type_param=True, name=name, regex=regex, keep_params=keep_params,
+                ))
     return sorted(info_map)
 
 
-
-def collect_infos(param_element, is_type_param=False):
+def collect_infos(param_element, is_type_param=False, name=None, regex=None, keep_params=False):
     """
     Collects parameters of the provided element.
+    Filters by name before anything else is read,
+    values are only read when accessed.
     Args:
         param_element: Element that holds the parameters.
+        name: only parameters with exactly this name
+        regex: pattern or compiled regex, only parameters with names matching (re.search)
+        keep_params: hold Parameter objects instead of definitions
     Returns:
-        Returns a dictionary, with parameters.
+        Returns a list of ParamInfo.
     """
-
-    parameters = param_element.Parameters
+    if regex:
+        regex = re.compile(regex)
     param_infos = []
 
-    for param in parameters:
-        param_value = get_val(None, None, param)
-
+    for param in param_element.Parameters:
+        definition = param.Definition
+        param_name = definition.Name
+        if name and param_name != name:
+            continue
+        if regex and not regex.search(param_name):
+            continue
         param_info = ParamInfo(
             is_type_param,
-            param.Definition.Name,
-            param_value,
+            param_name,
             param.StorageType,
             param.HasValue,
             param.IsShared,
             param.IsReadOnly,
-            param,
+            param=param if keep_params else None,
+            definition=definition,
+            element=param_element,
         )
         param_infos.append(param_info)
 
     return param_infos
 
 
+class ParamInfo(object):
+    """
+    Compact parameter record, the value is read on first access.
+    Holds either the Parameter or the definition and element
+    to get the Parameter back from.
+    Sorts by (type_param, name).
+    """
+    __slots__ = (
+        "type_param", "name", "dtype", "has_value", "shared", "read_only",
+        "definition", "element", "_param", "_value",
+    )
+
+    def __init__(self, type_param, name, dtype, has_value, shared, read_only,
+                 param=None, definition=None, element=None):
+        self.type_param = type_param
+        self.name = name
+        self.dtype = dtype
+        self.has_value = has_value
+        self.shared = shared
+        self.read_only = read_only
+        self.definition = definition
+        self.element = element
+        self._param = param
+        self._value = _UNREAD
+
+    @property
+    def param(self):
+        if self._param:
+            return self._param
+        return self.element.get_Parameter(self.definition)
+
+    @property
+    def value(self):
+        if self._value is _UNREAD:
+            param = self.param
+            self._value = get_val(None, self.name, param) if param else None
+        return self._value
+
+    def _sort_key(self):
+        return self.type_param, self.name
+
+    def __lt__(self, other):
+        return self._sort_key() < other._sort_key()
+
+    def __repr__(self):
+        return "ParamInfo(type_param={}, name={}, value={}, dtype={}, has_value={}, shared={}, read_only={})".format(
+            self.type_param, self.name, self.value, self.dtype, self.has_value, self.shared, self.read_only,
+        )
+
+
+def get_param(elem, param_name, bip=False):
+    """
+    Retrieves parameter of element by name, without the linear
+    LookupParameter search once the name was resolved for elements
+    of the same document, class, category and type.
+    Misses are cached under the same key with the BuiltInParameter
+    candidates of the name, later elements only re-check those,
+    as built in instance parameters may exist on only some instances.
+    Names are resolved via the BuiltInParameter index first
+    (display names in the current language), then LookupParameter,
+    then a BuiltInParameter enum name or normalized alias,
+    only if it belongs to exactly one BuiltInParameter.
+    :param elem: the element holding the parameter
+    :param param_name: name of the parameter or key of bip_map if bip
+    :param bip: look up param_name in bip_map or as BuiltInParameter name
+    :return: Parameter or None if not found
+    """
+    if bip:
+        if param_name in bip_map:
+            return elem.get_Parameter(bip_map[param_name])
+        return _lookup_bip(elem, get_bip_index().candidates(param_name))
+    key = _handle_key(elem, param_name)
+    handle = _handle_cache.get(key)
+    if handle:
+        kind, ref = handle
+        if kind == "missing":
+            _handle_stats["missing"] += 1
+            label_bips, alias_bips = ref
+            param = _lookup_bip(elem, label_bips, param_name) or _lookup_bip(elem, alias_bips)
+            if param:
+                _handle_cache[key] = _param_handle(param)
+            return param
+        param = elem.get_Parameter(ref)
+        if param:
+            return param
+        _handle_stats["stale"] += 1
+    _handle_stats["resolved"] += 1
+    bip_index = get_bip_index()
+    label_bips = bip_index.label_bips(param_name)
+    param = (
+        _lookup_bip(elem, label_bips, param_name) or
+        elem.LookupParameter(param_name)
+    )
+    alias_bips = []
+    if not param:
+        alias_bips = bip_index.alias_bips(param_name)
+        if len(alias_bips) == 1:
+            param = _lookup_bip(elem, alias_bips)
+        else:
+            alias_bips = []
+    if param:
+        _handle_cache[key] = _param_handle(param)
+    else:
+        _handle_cache[key] = "missing", (label_bips, alias_bips)
+    return param
+
+
+def _lookup_bip(elem, bips, param_name=None):
+    for built_in in bips:
+        param = elem.get_Parameter(built_in)
+        if param and (param_name is None or param.Definition.Name == param_name):
+            return param
+
+
+def get_bip_index():
+    """
+    Retrieves the BuiltInParameter index of this session,
+    loaded from the cache dir or built and cached on first use.
+    :return: BipIndex
+    """
+    global _bip_index
+    if _bip_index is None:
+        _bip_index = BipIndex.load_or_build()
+    return _bip_index
+
+
+class BipIndex(object):
+    """
+    Maps display names (in the current Revit language) and
+    normalized aliases of display and enum names to BuiltInParameter
+    enum names. Several BuiltInParameters may share a name.
+    """
+    def __init__(self, labels=None, aliases=None):
+        self.labels = labels or {}
+        self.aliases = aliases or {}
+
+    @classmethod
+    def build(cls):
+        """
+        Enumerates BuiltInParameter with LabelUtils labels.
+        :return: BipIndex
+        """
+        index = cls()
+        get_label = getattr(DB, "LabelUtils", None)
+        for bip_name in _bip_names():
+            index._add(index.aliases, normalize_name(bip_name), bip_name)
+            if not get_label:
+                continue
+            try:
+                label = get_label.GetLabelFor(getattr(Bip, bip_name))
+            except Exception:
+                continue
+            if label:
+                index._add(index.labels, label, bip_name)
+                index._add(index.aliases, normalize_name(label), bip_name)
+        return index
+
+    @classmethod
+    def load_or_build(cls):
+        """
+        Loads the index of the current Revit version and language
+        from the cache dir, builds and saves it if missing or
+        written with another format version or BuiltInParameter count.
+        :return: BipIndex
+        """
+        cache_name = "bip_index_{}.json".format(_session_key())
+        bip_count = len(_bip_names())
+        data = cache.load_json(cache_name)
+        if data and data.get("version") == BIP_INDEX_VERSION and data.get("count") == bip_count:
+            return cls(data.get("labels"), data.get("aliases"))
+        index = cls.build()
+        try:
+            cache.save_json(cache_name, {
+                "version": BIP_INDEX_VERSION,
+                "count": bip_count,
+                "labels": index.labels,
+                "aliases": index.aliases,
+            })
+        except (IOError, OSError) as error:
+            print("bip index not cached: {}".format(error))
+        return index
+
+    @staticmethod
+    def _add(mapping, name, bip_name):
+        bip_names = mapping.setdefault(name, [])
+        if bip_name not in bip_names:
+            bip_names.append(bip_name)
+
+    def label_bips(self, name):
+        """
+        :param name: display name
+        :return: list of BuiltInParameter with exactly this label
+        """
+        return [getattr(Bip, bip_name) for bip_name in self.labels.get(name, ())]
+
+    def alias_bips(self, name):
+        """
+        :param name: enum name, display name in any case or spacing
+        :return: list of BuiltInParameter matching the normalized name
+        """
+        return [getattr(Bip, bip_name) for bip_name in self.aliases.get(normalize_name(name), ())]
+
+    def candidates(self, name):
+        """
+        :param name: display, enum or alias name
+        :return: list of BuiltInParameter, exact label matches first
+        """
+        bips = self.label_bips(name)
+        bips.extend(built_in for built_in in self.alias_bips(name) if built_in not in bips)
+        return bips
+
+
+def normalize_name(name):
+    """
+    Normalizes a parameter name for alias lookup:
+    lower case, umlauts transcribed, only letters and digits.
+    :param name:
+    :return: str
+    """
+    name = name.lower()
+    for umlaut, transcription in UMLAUTS:
+        name = name.replace(umlaut, transcription)
+    return re_not_alnum.sub("", name)
+
+
+def _bip_names():
+    return [bip_name for bip_name in dir(Bip) if bip_name.isupper() and bip_name != "INVALID"]
+
+
+def _session_key():
+    app = doc.Application
+    return "{}_{}".format(app.VersionNumber, app.Language.ToString())
+
+
+def read_many(elements, names, as_string=False):
+    """
+    Reads parameters of many elements column wise. Storage type
+    is resolved once per column, doubles are collected in array("d"),
+    integers and element id ints in array("l"), strings in lists.
+    Missing or empty values get the empty value of the column type.
+    Columns with mixed storage types degrade to lists of get_val values.
+    :param elements: iterable of Elements
+    :param names: parameter names
+    :param as_string: read AsValueString for non string parameters
+    :return: OrderedDict of name: column, in elements order,
+     list of None if no element has the parameter
+    """
+    elements = list(elements)
+    columns = OrderedDict()
+    for name in names:
+        params = [get_param(elem, name) for elem in elements]
+        columns[name] = _read_column(params, as_string)
+    return columns
+
+
+def _read_column(params, as_string):
+    dtype = next((param.StorageType for param in params if param), None)
+    if dtype is None:
+        return [None] * len(params)
+    if as_string:
+        read = _as_string
+        empty = ""
+        column = []
+    else:
+        read = column_readers[dtype]
+        empty = column_empty[dtype]
+        typecode = column_typecodes.get(dtype)
+        column = array(typecode) if typecode else []
+    append = column.append
+    for param in params:
+        if not param or not param.HasValue:
+            append(empty)
+        elif param.StorageType != dtype:
+            return _read_mixed(params, as_string)
+        else:
+            append(read(param))
+    return column
+
+
+def _read_mixed(params, as_string):
+    if as_string:
+        return [_as_string(param) if param and param.HasValue else "" for param in params]
+    return [get_val(None, None, param) if param else None for param in params]
+
+
+def _as_string(param):
+    if param.StorageType == DB.StorageType.String:
+        return param.AsString() or ""
+    return param.AsValueString() or ""
+
+
+def clear_param_cache():
+    """
+    Clears resolved parameter handles and cached misses,
+    e.g. after parameters got added or bindings changed.
+    :return:
+    """
+    _handle_cache.clear()
+    for kind in _handle_stats:
+        _handle_stats[kind] = 0
+
+
+def _handle_key(elem, param_name):
+    # host and linked documents share category and may share type ids
+    document = elem.Document
+    doc_key = (document.PathName or document.Title) if document else None
+    category = elem.Category
+    category_id = category.Id.IntegerValue if category else -1
+    return doc_key, elem.__class__.__name__, category_id, elem.GetTypeId().IntegerValue, param_name
+
+
+def _param_handle(param):
+    definition = param.Definition
+    built_in = getattr(definition, "BuiltInParameter", Bip.INVALID)
+    if built_in != Bip.INVALID:
+        return "bip", built_in
+    if param.IsShared:
+        return "guid", param.GUID
+    return "definition", definition
+
+
 def get_val(elem, param_name, param=None, bip=False):
     """
     Retrieves parameter value of element or parameter
@@ -88,10 +422,7 @@ def get_val(elem, param_name, param=None, bip=False):
     :return: value of the parameter or empty of type
     """
     if not param:
-        if bip:
-            param = elem.get_Parameter(bip_map[param_name])
-        else:
-            param = elem.LookupParameter(param_name)
+        param = get_param(elem, param_name, bip=bip)
     if param:
         dtype = param.StorageType
         if param.HasValue:
@@ -111,16 +442,363 @@ def set_val(elem, param_name, value, param=None, bip=False):
     :return:
     """
     if not param:
-        if bip:
-            param = elem.get_Parameter(bip_map[param_name])
-        else:
-            param = elem.LookupParameter(param_name)
+        param = get_param(elem, param_name, bip=bip)
     if param:
         param.Set(value)
     else:
         print("param not found: {}".format(param_name))
 
 
+class TypeValueCache(object):
+    """
+    Reads parameter values of each ElementType once per run
+    and shares them between all instances of the type.
+    Assumes types are not modified while the cache is in use.
+    """
+    def __init__(self, read=None):
+        """
+        :param read: callable(element, names) returning a dict of
+         name: value, defaults to read_values
+        """
+        self.read = read or read_values
+        self.values = {}
+        self.infos = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_type(self, element):
+        """
+        :param element:
+        :return: ElementType of element or None
+        """
+        type_id = element.GetTypeId()
+        if type_id == DB.ElementId.InvalidElementId:
+            return None
+        return doc.GetElement(type_id)
+
+    def get(self, elem_type, names):
+        """
+        Retrieves the values of names of elem_type,
+        read only on first request per type and names.
+        The returned dict is shared, do not modify it.
+        :param elem_type: ElementType
+        :param names: list of parameter names
+        :return: dict of name: value
+        """
+        type_id = elem_type.Id.IntegerValue
+        entry = self.values.get(type_id)
+        if entry and (entry[0] is names or entry[0] == names):
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        values = self.read(elem_type, names)
+        self.values[type_id] = names, values
+        return values
+
+    def get_infos(self, elem_type, name=None, regex=None, keep_params=False):
+        """
+        Retrieves collect_infos of elem_type, collected once per type and filters.
+        :param elem_type: ElementType
+        :return: list of ParamInfo
+        """
+        key = elem_type.Id.IntegerValue, name, getattr(regex, "pattern", regex), keep_params
+        if key in self.infos:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.infos[key] = collect_infos(
+                elem_type, is_type_param=True, name=name, regex=regex, keep_params=keep_params,
+            )
+        return self.infos[key]
+
+    def merged(self, element, names):
+        """
+        Retrieves values of names of element, values of parameters
+        the instance does not have are taken from its type.
+        :param element: Element
+        :param names: list of parameter names
+        :return: OrderedDict of name: value, None if found on neither
+        """
+        values = read_values(element, names)
+        missing = [name for name, value in values.items() if value is None]
+        if missing:
+            elem_type = self.get_type(element)
+            if elem_type:
+                type_values = self.get(elem_type, names)
+                for name in missing:
+                    values[name] = type_values.get(name)
+        return values
+
+    def clear(self):
+        self.values.clear()
+        self.infos.clear()
+
+    def __repr__(self):
+        return "<TypeValueCache types:{} hits:{} misses:{}>".format(len(self.values), self.hits, self.misses)
+
+
+def read_values(element, names):
+    """
+    Reads values of names of a single element.
+    :param element:
+    :param names: list of parameter names
+    :return: OrderedDict of name: value, None if not found
+    """
+    values = OrderedDict()
+    for name in names:
+        param = get_param(element, name)
+        values[name] = get_val(None, name, param) if param else None
+    return values
+
+
+class ParamWriter(object):
+    """
+    Queues parameter writes and applies only those that change
+    the current value, so unchanged elements are neither modified
+    in the transaction nor borrowed in worksharing.
+    Keeps changed / unchanged / failed counts per parameter name.
+    """
+    def __init__(self, tolerance=1e-9):
+        self.tolerance = tolerance
+        self.pending = []
+        self.report = defaultdict(lambda: {"changed": 0, "unchanged": 0, "failed": 0})
+        self.failures = []
+
+    def __len__(self):
+        return len(self.pending)
+
+    def queue(self, elem, param_name, value, bip=False):
+        """
+        Queues a write, nothing is read or set before apply.
+        :param elem: the element holding the parameter
+        :param param_name: name of the parameter or key of bip_map if bip
+        :param value: the new value
+        :param bip: look up param_name in bip_map
+        :return:
+        """
+        self.pending.append((elem, param_name, value, bip))
+
+    def apply(self, transaction_name=None):
+        """
+        Writes the queued values that differ from the current ones.
+        :param transaction_name: opens a transaction with this name,
+         otherwise the caller has to have a transaction open
+         if anything changed
+        :return: report dict of param_name: counts dict
+        """
+        changes = []
+        for elem, param_name, value, bip in self.pending:
+            param = get_param(elem, param_name, bip=bip)
+            if not param or param.IsReadOnly:
+                self._fail(elem, param_name, "not found" if not param else "read only")
+            elif is_equal(param, value, self.tolerance):
+                self.report[param_name]["unchanged"] += 1
+            else:
+                changes.append((elem, param_name, param, value))
+        self.pending = []
+        if changes and transaction_name:
+            with db.Transaction(transaction_name):
+                self._write(changes)
+        elif changes:
+            self._write(changes)
+        return self.report
+
+    def _write(self, changes):
+        for elem, param_name, param, value in changes:
+            try:
+                written = param.Set(value)
+            except Exception as error:
+                self._fail(elem, param_name, str(error))
+                continue
+            if written is False:
+                self._fail(elem, param_name, "Set returned False")
+            else:
+                self.report[param_name]["changed"] += 1
+
+    def _fail(self, elem, param_name, reason):
+        self.report[param_name]["failed"] += 1
+        self.failures.append((elem.Id, param_name, reason))
+
+    def print_report(self, title="parameter writes:"):
+        """
+        Prints counts per parameter and failed writes.
+        :param title:
+        :return:
+        """
+        print(title)
+        for param_name in sorted(self.report):
+            counts = self.report[param_name]
+            print("{}: {} changed, {} unchanged, {} failed".format(
+                param_name, counts["changed"], counts["unchanged"], counts["failed"]))
+        for elem_id, param_name, reason in self.failures:
+            print("failed: {} {}: {}".format(elem_id, param_name, reason))
+
+
+class ValueFormatter(object):
+    """
+    Cached AsValueString for Double and Integer parameters,
+    keyed by (spec, raw value), so repeated values format once.
+    Length, area, volume and angle doubles are formatted in python
+    from the document Units if their accuracy is a power of ten
+    and no digit grouping, unit symbol, plus prefix or zero
+    suppression is set.
+    The python path is checked against AsValueString for the first
+    validate_samples values of each spec and disabled on mismatch.
+    """
+    def __init__(self, document=None, max_size=100000, validate_samples=3):
+        self.units = (document or doc).GetUnits()
+        self.max_size = max_size
+        self.validate_samples = validate_samples
+        self.cache = {}
+        self.fast = {}
+        self.validated = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+        self.fast_formatted = 0
+        spec_type_id = getattr(DB, "SpecTypeId", None)
+        self.fast_specs = set()
+        if spec_type_id:
+            self.fast_specs = {getattr(spec_type_id, name).TypeId for name in FAST_SPEC_NAMES}
+
+    def format(self, param):
+        """
+        Formats the value of param like AsValueString.
+        :param param: Parameter with value
+        :return: str
+        """
+        storage_type = param.StorageType
+        definition = param.Definition
+        if storage_type == DB.StorageType.Double:
+            raw = param.AsDouble()
+            spec = get_spec_id(definition)
+        elif storage_type == DB.StorageType.Integer:
+            # integer labels like yes/no or enums depend on the parameter
+            raw = param.AsInteger()
+            spec = get_spec_id(definition), definition.Name
+        else:
+            return param.AsValueString() or ""
+        key = spec, raw
+        text = self.cache.get(key)
+        if text is not None:
+            self.hits += 1
+            return text
+        self.misses += 1
+        if storage_type == DB.StorageType.Double:
+            text = self._format_fast(spec, raw, param)
+        if text is None:
+            text = param.AsValueString() or ""
+        if len(self.cache) < self.max_size:
+            self.cache[key] = text
+        return text
+
+    def _format_fast(self, spec, raw, param):
+        if spec not in self.fast:
+            self.fast[spec] = self._fast_options(spec)
+        options = self.fast[spec]
+        if not options:
+            return None
+        text = format_number(raw, *options)
+        if self.validated[spec] < self.validate_samples:
+            self.validated[spec] += 1
+            expected = param.AsValueString() or ""
+            if text != expected:
+                print("ValueFormatter: python formatting disabled for {}: '{}' != '{}'".format(spec, text, expected))
+                self.fast[spec] = None
+                return expected
+        self.fast_formatted += 1
+        return text
+
+    def _fast_options(self, spec):
+        if spec not in self.fast_specs:
+            return None
+        try:
+            format_options = self.units.GetFormatOptions(DB.ForgeTypeId(spec))
+            factor = DB.UnitUtils.ConvertFromInternalUnits(1.0, format_options.GetUnitTypeId())
+            decimals = accuracy_decimals(format_options.Accuracy)
+            decimal_comma = self.units.DecimalSymbol.ToString() == "Comma"
+            plain = not any(getattr(format_options, flag) for flag in FAST_UNSUPPORTED_FLAGS)
+            plain = plain and format_options.GetSymbolTypeId().Empty()
+        except Exception:
+            return None
+        if decimals is None or not plain:
+            return None
+        return factor, decimals, decimal_comma
+
+    def __repr__(self):
+        return "<ValueFormatter cached:{} hits:{} misses:{} python formatted:{}>".format(
+            len(self.cache), self.hits, self.misses, self.fast_formatted)
+
+
+def get_spec_id(definition):
+    """
+    Retrieves a hashable spec of a parameter definition:
+    the data type id, or the ParameterType before Revit 2022.
+    :param definition:
+    :return: str
+    """
+    try:
+        return definition.GetDataType().TypeId
+    except AttributeError:
+        return definition.ParameterType.ToString()
+
+
+def accuracy_decimals(accuracy):
+    """
+    Retrieves the decimal places of a FormatOptions accuracy.
+    :param accuracy: float e.g. 0.01
+    :return: int or None if accuracy is no power of ten <= 1
+    """
+    if accuracy <= 0 or accuracy > 1:
+        return None
+    decimals = int(round(-log10(accuracy)))
+    if abs(10 ** -decimals - accuracy) > accuracy * 1e-6:
+        return None
+    return decimals
+
+
+def format_number(raw, factor, decimals, decimal_comma=False):
+    """
+    Formats an internal unit value in display units,
+    rounded half up like Revit.
+    :param raw: float in internal units
+    :param factor: display units per internal unit
+    :param decimals: int decimal places
+    :param decimal_comma: use "," as decimal symbol
+    :return: str
+    """
+    value = Decimal(repr(raw * factor)).quantize(Decimal(1).scaleb(-decimals), rounding=ROUND_HALF_UP)
+    text = "{:f}".format(value)
+    if text.startswith("-") and not text.strip("-0."):
+        text = text[1:]
+    if decimal_comma:
+        text = text.replace(".", ",")
+    return text
+
+
+def is_equal(param, value, tolerance=1e-9):
+    """
+    Checks if value equals the current value of param.
+    Doubles are compared within tolerance, element ids by int,
+    empty strings equal None.
+    :param param: Parameter
+    :param value: value as passed to Set
+    :param tolerance: float for double parameters
+    :return: bool
+    """
+    dtype = param.StorageType
+    current = get_val(None, None, param)
+    if dtype == DB.StorageType.Double:
+        try:
+            return abs(current - float(value)) <= tolerance
+        except (TypeError, ValueError):
+            return False
+    if dtype == DB.StorageType.ElementId:
+        return current.IntegerValue == getattr(value, "IntegerValue", value)
+    if dtype == DB.StorageType.String:
+        return (current or "") == (value or "")
+    return current == value
+
+
 dtype_methods = {
     DB.StorageType.String   : DB.Parameter.AsString,
     DB.StorageType.Integer  : DB.Parameter.AsInteger,
@@ -133,6 +811,23 @@ dtype_empty = {
     DB.StorageType.Double : 0.0,
     DB.StorageType.ElementId: DB.ElementId(-1),
 }
+column_readers = {
+    DB.StorageType.String   : DB.Parameter.AsString,
+    DB.StorageType.Integer  : DB.Parameter.AsInteger,
+    DB.StorageType.Double   : DB.Parameter.AsDouble,
+    DB.StorageType.ElementId: lambda param: param.AsElementId().IntegerValue,
+}
+column_empty = {
+    DB.StorageType.String   : "",
+    DB.StorageType.Integer  : 0,
+    DB.StorageType.Double   : 0.0,
+    DB.StorageType.ElementId: -1,
+}
+column_typecodes = {
+    DB.StorageType.Integer  : "l",
+    DB.StorageType.Double   : "d",
+    DB.StorageType.ElementId: "l",
+}
 bip_map = {
     "type_name"              : Bip.ALL_MODEL_TYPE_NAME,
     "comments"               : Bip.ALL_MODEL_INSTANCE_COMMENTS,
@@ -150,7 +845,17 @@ bip_map = {
     "wall_thickness"         : Bip.WALL_ATTR_WIDTH_PARAM,
 }
 
-ParamInfo = namedtuple("ParamInfo", "type_param name value dtype has_value shared read_only param")
+FAST_SPEC_NAMES = ("Length", "Area", "Volume", "Angle")
+FAST_UNSUPPORTED_FLAGS = ("UseDigitGrouping", "SuppressTrailingZeros", "SuppressLeadingZeros", "UsePlusPrefix")
+
+_handle_cache = {}
+_bip_index = None
+BIP_INDEX_VERSION = 2
+re_not_alnum = re.compile(r"[^a-z0-9]+")
+UMLAUTS = ((u"\u00e4", "ae"), (u"\u00f6", "oe"), (u"\u00fc", "ue"), (u"\u00df", "ss"))
+_handle_stats = {"resolved": 0, "stale": 0, "missing": 0}
+
+_UNREAD = object()
 TITLE_INST_PARAMS = "INSTANCE PARAMETERS" + 50 * "_"
 TITLE_TYPE_PARAMS = "TYPE PARAMETERS    " + 50 * "_"
 
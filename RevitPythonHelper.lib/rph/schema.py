@@ -0,0 +1,182 @@
+"""
+Per model registry of the parameter columns of categories,
+persisted in the rph cache dir and valid as long as the
+parameter bindings, loaded families and Revit version are unchanged
+and the parameters of one element per type are the registered ones.
+Saves data_dump the discovery pass over all elements of a category.
+"""
+import hashlib
+import json
+import re
+from Autodesk.Revit.DB import FilteredElementCollector as Fec
+from Autodesk.Revit.DB import Family
+from rph import cache
+
+
+class SchemaRegistry(object):
+    """
+    Column names and storage types per category and
+    kind ("instance" or "type") of one model.
+    """
+    def __init__(self, doc):
+        self.doc = doc
+        # models of the same title in different folders get their own file
+        path_hash = hashlib.md5((doc.PathName or doc.Title).encode("utf-8")).hexdigest()[:12]
+        self.cache_name = "schema_{}_{}.json".format(re_unsafe_chars.sub("_", doc.Title), path_hash)
+        self.signature = get_model_signature(doc)
+        self.categories = {}
+        self.discovered = 0
+        self.reused = 0
+        self.invalidated = 0
+        self.load()
+
+    def load(self):
+        """
+        Loads the persisted schema if its signature matches the model.
+        :return: bool: True if a valid schema was loaded
+        """
+        data = cache.load_json(self.cache_name)
+        if not data or data.get("version") != SCHEMA_VERSION or data.get("signature") != self.signature:
+            self.categories = {}
+            return False
+        self.categories = data.get("categories", {})
+        return True
+
+    def save(self):
+        """
+        Persists the schema with the current model signature.
+        :return: str: path
+        """
+        return cache.save_json(self.cache_name, {
+            "version": SCHEMA_VERSION,
+            "signature": self.signature,
+            "categories": self.categories,
+        })
+
+    def get(self, cat_name, kind):
+        """
+        :param cat_name: category name as used by data_dump
+        :param kind: "instance" or "type"
+        :return: list of [name, storage_type, sampled] or None if unknown
+        """
+        return self.categories.get(cat_name, {}).get(kind)
+
+    def names(self, cat_name, kind, elements):
+        """
+        Retrieves the sorted parameter names of a category,
+        discovered from elements if not registered yet or
+        if the registered columns fail validate.
+        :param cat_name: category name as used by data_dump
+        :param kind: "instance" or "type"
+        :param elements: elements of the category, iterated twice on rediscovery
+        :return: list of parameter names
+        """
+        columns = self.get(cat_name, kind)
+        if columns is not None and not self.validate(columns, kind, elements):
+            self.invalidated += 1
+            columns = None
+        if columns is None:
+            columns = self.discover(cat_name, kind, elements)
+        else:
+            self.reused += 1
+        return [name for name, storage_type, sampled in columns]
+
+    def validate(self, columns, kind, elements):
+        """
+        Compares the parameters of one element per type with the
+        registered columns seen on these samples at discovery,
+        catching parameters added or removed by reloaded families
+        and new system family types the signature misses.
+        :param columns: list of [name, storage_type, sampled]
+        :param kind: "instance" or "type"
+        :param elements: elements of the category
+        :return: bool: True if the samples have exactly the sampled columns
+        """
+        sampled_names = {name for name, storage_type, sampled in columns if sampled}
+        return sample_names(kind, elements) == sampled_names
+
+    def discover(self, cat_name, kind, elements):
+        """
+        Collects parameter names and storage types of elements
+        and registers them for the category.
+        :param cat_name: category name as used by data_dump
+        :param kind: "instance" or "type"
+        :param elements: elements of the category
+        :return: list of [name, storage_type, sampled] sorted by name,
+                 sampled: True if on one element per type, see validate
+        """
+        storage_types = {}
+        sampled_names = set()
+        sampled_types = set()
+        for element in elements:
+            type_id = sample_type_id(kind, element)
+            is_sample = type_id not in sampled_types
+            sampled_types.add(type_id)
+            for param in element.Parameters:
+                param_name = param.Definition.Name
+                if is_sample:
+                    sampled_names.add(param_name)
+                if param_name not in storage_types:
+                    storage_types[param_name] = param.StorageType.ToString()
+        columns = [[name, storage_types[name], name in sampled_names] for name in sorted(storage_types)]
+        self.categories.setdefault(cat_name, {})[kind] = columns
+        self.discovered += 1
+        return columns
+
+    def __repr__(self):
+        return "<SchemaRegistry {} categories:{} reused:{} invalidated:{} discovered:{}>".format(
+            self.cache_name, len(self.categories), self.reused, self.invalidated, self.discovered)
+
+
+def sample_type_id(kind, element):
+    """
+    :param kind: "instance" or "type"
+    :param element: element of a category
+    :return: int: id of its type, the own id for types
+    """
+    if kind == "type":
+        return element.Id.IntegerValue
+    return element.GetTypeId().IntegerValue
+
+
+def sample_names(kind, elements):
+    """
+    :param kind: "instance" or "type"
+    :param elements: elements of a category
+    :return: set of the parameter names of the first element per type
+    """
+    names = set()
+    sampled_types = set()
+    for element in elements:
+        type_id = sample_type_id(kind, element)
+        if type_id in sampled_types:
+            continue
+        sampled_types.add(type_id)
+        names.update(param.Definition.Name for param in element.Parameters)
+    return names
+
+
+def get_model_signature(doc):
+    """
+    Hashes what determines the parameter sets of elements:
+    project / shared parameter bindings, loaded family names
+    and Revit version.
+    :param doc: Document
+    :return: str: hex digest
+    """
+    bindings = []
+    iterator = doc.ParameterBindings.ForwardIterator()
+    while iterator.MoveNext():
+        binding = iterator.Current
+        bindings.append([
+            iterator.Key.Name,
+            binding.GetType().Name,
+            sorted(category.Name for category in binding.Categories),
+        ])
+    families = sorted(family.Name for family in Fec(doc).OfClass(Family))
+    data = json.dumps([doc.Application.VersionNumber, sorted(bindings), families])
+    return hashlib.md5(data.encode("utf-8")).hexdigest()
+
+
+re_unsafe_chars = re.compile(r"[^\w.-]+")
+SCHEMA_VERSION = 2
@@ -0,0 +1,378 @@
+"""
+Row sinks of data_dump: buffered csv, delta csv against the
+row hashes of the previous dump, and sqlite upserts,
+plus reading and reconstructing delta dumps.
+Plain python, usable without Revit.
+"""
+import csv
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+from datetime import datetime
+
+
+class CsvSink(object):
+    """
+    Buffered csv writer of dump rows: ";" delimited,
+    values containing ";", quotes or line breaks are quoted.
+    """
+    def __init__(self, path, header, buffer_size=1000, resume_offset=None):
+        """
+        :param resume_offset: truncate an existing file to this byte
+         offset and append to it instead of writing a new file
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self.rows = 0
+        self._buffer = []
+        resume = resume_offset is not None and os.path.exists(path)
+        if resume:
+            with open(path, "r+b") as resumed_file:
+                resumed_file.truncate(resume_offset)
+        self._file = open_csv(path, "a" if resume else "w")
+        self._writer = csv.writer(self._file, delimiter=";", quoting=csv.QUOTE_MINIMAL)
+        if not resume:
+            self._writer.writerow(header)
+
+    def write(self, row):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        if self._buffer:
+            self._writer.writerows(self._buffer)
+            self.rows += len(self._buffer)
+            self._buffer = []
+
+    def size(self):
+        """
+        :return: int: bytes written to the file so far
+        """
+        self._file.flush()
+        return os.path.getsize(self.path)
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class HashingCsvSink(CsvSink):
+    """
+    CsvSink writing a full category file while recording
+    the row hash per UniqueId for later delta dumps.
+    """
+    def __init__(self, path, header, buffer_size=1000):
+        CsvSink.__init__(self, path, header, buffer_size=buffer_size)
+        self.hashes = {}
+
+    def write(self, row):
+        self.hashes[row[GUID_COLUMN]] = row_hash(row)
+        CsvSink.write(self, row)
+
+    def manifest_entry(self):
+        return {
+            "full": os.path.basename(self.path),
+            "counts": {"rows": self.rows},
+        }
+
+
+class DeltaSink(object):
+    """
+    Writes only rows that differ from the previous dump:
+    <base>_added.csv, <base>_modified.csv with full rows and
+    <base>_deleted.csv with the UniqueIds of vanished rows.
+    """
+    def __init__(self, base_path, header, previous_hashes, buffer_size=1000):
+        self.base_path = base_path
+        self.previous_hashes = previous_hashes
+        self.hashes = {}
+        self.rows = 0
+        self.deleted = 0
+        self.added_sink = CsvSink(base_path + "_added.csv", header, buffer_size=buffer_size)
+        self.modified_sink = CsvSink(base_path + "_modified.csv", header, buffer_size=buffer_size)
+
+    def write(self, row):
+        unique_id = row[GUID_COLUMN]
+        hashed = row_hash(row)
+        self.hashes[unique_id] = hashed
+        self.rows += 1
+        previous = self.previous_hashes.get(unique_id)
+        if previous is None:
+            self.added_sink.write(row)
+        elif previous != hashed:
+            self.modified_sink.write(row)
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        self.added_sink.flush()
+        self.modified_sink.flush()
+
+    def close(self):
+        self.added_sink.close()
+        self.modified_sink.close()
+        with CsvSink(self.base_path + "_deleted.csv", ["GUID"]) as deleted_sink:
+            for unique_id in self.previous_hashes:
+                if unique_id not in self.hashes:
+                    deleted_sink.write((unique_id,))
+        self.deleted = deleted_sink.rows
+
+    def manifest_entry(self):
+        return {
+            "added": os.path.basename(self.added_sink.path),
+            "modified": os.path.basename(self.modified_sink.path),
+            "deleted": os.path.basename(self.base_path + "_deleted.csv"),
+            "counts": {
+                "rows": self.rows,
+                "added": self.added_sink.rows,
+                "modified": self.modified_sink.rows,
+                "deleted": self.deleted,
+            },
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class SqliteSink(object):
+    """
+    Upserts dump rows into a sqlite table in executemany batches.
+    The table is created or extended by missing columns, indexed
+    on id, UniqueId and level columns. Header names equal ignoring
+    case, as sqlite compares them, get a numbered suffix.
+    Rows of earlier runs that were not written again are deleted on close.
+    Commit is left to the caller, so a dump is one transaction.
+    """
+    def __init__(self, connection, table, header, key_column, buffer_size=1000, run=None):
+        self.connection = connection
+        self.table = table
+        self.buffer_size = buffer_size
+        self.run = run
+        self.rows = 0
+        self._buffer = []
+        # the run column keeps its name, a parameter of that name is renamed
+        columns = unique_columns([RUN_COLUMN] + list(header))
+        columns = columns[1:] + columns[:1]
+        self.columns = columns
+        self._ensure_table(columns, key_column)
+        self._insert = "INSERT OR REPLACE INTO {} ({}) VALUES ({})".format(
+            quote_identifier(table),
+            ", ".join(quote_identifier(column) for column in columns),
+            ", ".join("?" for column in columns),
+        )
+
+    def _ensure_table(self, columns, key_column):
+        table = quote_identifier(self.table)
+        definitions = []
+        for column in columns:
+            definition = quote_identifier(column) + (" INTEGER" if column in INTEGER_COLUMNS else " TEXT")
+            if column == key_column:
+                definition += " PRIMARY KEY"
+            definitions.append(definition)
+        cursor = self.connection.cursor()
+        cursor.execute("CREATE TABLE IF NOT EXISTS {} ({})".format(table, ", ".join(definitions)))
+        existing = {info[1].lower() for info in cursor.execute("PRAGMA table_info({})".format(table))}
+        for column, definition in zip(columns, definitions):
+            if column.lower() not in existing:
+                cursor.execute("ALTER TABLE {} ADD COLUMN {}".format(table, definition.replace(" PRIMARY KEY", "")))
+        for column in columns:
+            if column in INDEX_COLUMNS and column != key_column:
+                cursor.execute("CREATE INDEX IF NOT EXISTS {} ON {} ({})".format(
+                    quote_identifier("ix_{}_{}".format(self.table, column)), table, quote_identifier(column)))
+
+    def write(self, row):
+        self._buffer.append(tuple(row) + (self.run,))
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        if self._buffer:
+            self.connection.executemany(self._insert, self._buffer)
+            self.rows += len(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        self.flush()
+        if self.run:
+            delete_stale_rows(self.connection, self.table, self.run)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type:
+            # keep the last committed state, e.g. of a checkpointed chunk
+            self.connection.rollback()
+        else:
+            self.close()
+        return False
+
+
+def unique_columns(names):
+    """
+    Makes column names unique ignoring case, as sqlite compares
+    them, by appending _2, _3, .. to later duplicates.
+    :param names: list of column names
+    :return: list of column names
+    """
+    taken = set()
+    columns = []
+    for name in names:
+        column = name
+        number = 1
+        while column.lower() in taken:
+            number += 1
+            column = "{}_{}".format(name, number)
+        taken.add(column.lower())
+        columns.append(column)
+    return columns
+
+
+def quote_identifier(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def delete_stale_rows(connection, table, run):
+    """
+    Deletes the rows of a dump table not written by run,
+    e.g. of elements deleted since the last dump.
+    :param connection: sqlite3 connection
+    :param table: table name, ignored if the table does not exist
+    :param run: run timestamp of the current dump
+    :return:
+    """
+    if not connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+        return
+    connection.execute(
+        "DELETE FROM {} WHERE {} IS NOT ?".format(quote_identifier(table), quote_identifier(RUN_COLUMN)),
+        (run,),
+    )
+
+
+def row_hash(row):
+    """
+    :param row: tuple of str
+    :return: str: hex digest of the row values
+    """
+    return hashlib.md5(u"\x1f".join(row).encode("utf-8")).hexdigest()
+
+
+def load_delta_index(export_path):
+    """
+    Loads the sidecar index of the last delta dump into export_path.
+    :param export_path:
+    :return: dict with manifest name and per category header and hashes
+    """
+    index_path = os.path.join(export_path, DELTA_INDEX_NAME)
+    if not os.path.exists(index_path):
+        return {"manifest": None, "categories": {}}
+    with open(index_path) as index_file:
+        return json.load(index_file)
+
+
+def write_json(path, data):
+    with open(path + ".tmp", "w") as json_file:
+        json.dump(data, json_file)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(path + ".tmp", path)
+
+
+def reconstruct(export_path, cat_name, out_path=None, manifest_name=None):
+    """
+    Merges the last full dump of a category with all following
+    deltas into a full csv as of the given or latest run.
+    :param export_path: dir of the delta dumps
+    :param cat_name: category name as in the file names, e.g. "Doors"
+    :param out_path: optional target csv path
+    :param manifest_name: optional manifest of the run to reconstruct
+    :return: str: path of the written csv
+    """
+    manifest_name = manifest_name or load_delta_index(export_path)["manifest"]
+    chain = []
+    while manifest_name:
+        with open(os.path.join(export_path, manifest_name)) as manifest_file:
+            manifest = json.load(manifest_file)
+        entry = manifest["categories"].get(cat_name)
+        if entry:
+            chain.append(entry)
+            if "full" in entry:
+                break
+        manifest_name = manifest["previous"]
+    if not chain or "full" not in chain[-1]:
+        raise ValueError("no full dump of {} found in {}".format(cat_name, export_path))
+
+    header, rows = read_csv(os.path.join(export_path, chain[-1]["full"]))
+    rows_by_id = OrderedDict((row[GUID_COLUMN], row) for row in rows)
+    for entry in reversed(chain[:-1]):
+        for file_key in ("added", "modified"):
+            for row in read_csv(os.path.join(export_path, entry[file_key]))[1]:
+                rows_by_id[row[GUID_COLUMN]] = row
+        for row in read_csv(os.path.join(export_path, entry["deleted"]))[1]:
+            rows_by_id.pop(row[0], None)
+
+    out_path = out_path or os.path.join(export_path, "{}_{}_reconstructed.csv".format(
+        datetime.now().strftime("%Y%m%d_%H%M"), cat_name))
+    with CsvSink(out_path, header) as sink:
+        sink.write_rows(rows_by_id.values())
+    return out_path
+
+
+def read_csv(path):
+    """
+    Reads a dump csv.
+    :param path:
+    :return: tuple: header list, list of row lists
+    """
+    with open_csv(path, "r") as csv_file:
+        reader = csv.reader(csv_file, delimiter=";")
+        header = next(reader)
+        return header, list(reader)
+
+
+def open_csv(path, mode="w"):
+    """
+    Opens a file for the csv module on python 2 and 3.
+    :param path:
+    :param mode: "w", "a" or "r"
+    :return: file
+    """
+    if sys.version_info[0] < 3:
+        return open(path, mode + "b")
+    return open(path, mode, newline="")
+
+
+GUID_COLUMN = 1
+RUN_COLUMN = "dump_run"
+INTEGER_COLUMNS = {"rvt_id", "type_id"}
+INDEX_COLUMNS = {
+    "rvt_id", "GUID", "type_id",
+    "Level", "Base Level", "Base Constraint", "Reference Level", "Schedule Level",
+    "Ebene", "Basisebene", "Basisbedingung", "Referenzebene",
+}
+DELTA_INDEX_NAME = "data_dump_delta_index.json"
+DELTA_MANIFEST_SUFFIX = "data_dump_manifest.json"
@@ -0,0 +1,279 @@
+from collections import defaultdict
+from math import floor, sqrt
+from rph.bbx import bbox_coords
+
+
+class SpatialIndex(object):
+    """
+    Uniform grid hash over bboxes, built once per run
+    to answer "which elements are near this box" without
+    a FilteredElementCollector per query.
+    Boxes are given as BoundingBox or six float tuples, so plain
+    tuples serve as stand-in for element bboxes outside of Revit.
+    Tolerances follow BoundingBoxIntersectsFilter / BoundingBoxIsInsideFilter:
+    positive tolerance accepts boxes separated by up to that distance,
+    negative tolerance requires at least that much overlap.
+    Boxes spanning more than max_cells_per_box cells are not hashed
+    but kept in a list that is checked on every query.
+    """
+    def __init__(self, items=None, cell_size=None, max_cells_per_box=64):
+        self.cell_size = cell_size
+        self.max_cells_per_box = max_cells_per_box
+        self.boxes = {}
+        self.cells = defaultdict(list)
+        self.oversized = []
+        self._order = {}
+        if items:
+            self.build(items)
+
+    @classmethod
+    def from_elements(cls, elements, cell_size=None):
+        """
+        Creates an index of element bboxes keyed by element id int.
+        Elements without bbox are skipped.
+        :param elements: iterable of Elements
+        :param cell_size: optional grid cell size in ft
+        :return: SpatialIndex
+        """
+        items = []
+        for elem in elements:
+            bbox = elem.get_BoundingBox(None)
+            if bbox:
+                items.append((elem.Id.IntegerValue, bbox))
+        return cls(items, cell_size=cell_size)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __contains__(self, key):
+        return key in self.boxes
+
+    def bbox(self, key):
+        """
+        Retrieves the stored coordinates of key.
+        :param key:
+        :return: tuple: (min_x, min_y, min_z, max_x, max_y, max_z)
+        """
+        return self.boxes[key]
+
+    def build(self, items):
+        """
+        Inserts (key, bbox) items. Derives cell size from
+        the mean box extent if none was given.
+        :param items: iterable of (key, bbox)
+        :return:
+        """
+        items = [(key, bbox_coords(bbox)) for key, bbox in items]
+        if not self.cell_size:
+            self.cell_size = mean_extent(coords for key, coords in items) or 1.0
+        for key, coords in items:
+            self.insert(key, coords)
+
+    def insert(self, key, bbox):
+        """
+        Inserts a single box.
+        :param key: hashable, e.g. element id int
+        :param bbox: BoundingBox or six float tuple
+        :return:
+        """
+        if not self.cell_size:
+            raise ValueError("cell_size required to insert into empty SpatialIndex")
+        coords = bbox_coords(bbox)
+        if key in self.boxes:
+            self.remove(key)
+        self.boxes[key] = coords
+        self._order[key] = len(self._order)
+        ranges = self._cell_ranges(coords, 0.0)
+        if _range_count(ranges) > self.max_cells_per_box:
+            self.oversized.append(key)
+            return
+        for cell in _iter_cells(ranges):
+            self.cells[cell].append(key)
+
+    def remove(self, key):
+        """
+        Removes a box from the index.
+        :param key:
+        :return:
+        """
+        coords = self.boxes.pop(key)
+        self._order.pop(key)
+        if key in self.oversized:
+            self.oversized.remove(key)
+            return
+        for cell in _iter_cells(self._cell_ranges(coords, 0.0)):
+            self.cells[cell].remove(key)
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    def _cell_ranges(self, coords, grow):
+        # a query shrunk by a negative tolerance may be inverted,
+        # matching boxes still span the cells between its ends
+        size = self.cell_size
+        ranges = []
+        for axis in range(3):
+            start = int(floor((coords[axis] - grow) / size))
+            end = int(floor((coords[axis + 3] + grow) / size))
+            ranges.append((min(start, end), max(start, end)))
+        return ranges
+
+    def _candidates(self, coords, grow):
+        ranges = self._cell_ranges(coords, grow)
+        found = set(self.oversized)
+        if _range_count(ranges) > len(self.cells):
+            (x0, x1), (y0, y1), (z0, z1) = ranges
+            for (cx, cy, cz), keys in self.cells.items():
+                if x0 <= cx <= x1 and y0 <= cy <= y1 and z0 <= cz <= z1:
+                    found.update(keys)
+        else:
+            cells = self.cells
+            for cell in _iter_cells(ranges):
+                if cell in cells:
+                    found.update(cells[cell])
+        return found
+
+    def _sorted(self, keys):
+        return sorted(keys, key=self._order.__getitem__)
+
+    def overlapping(self, bbox, tolerance=0.0):
+        """
+        Retrieves keys of boxes intersecting bbox, like
+        BoundingBoxIntersectsFilter(Outline(bbox), tolerance).
+        :param bbox: BoundingBox or six float tuple
+        :param tolerance: float in ft
+        :return: list of keys in insertion order
+        """
+        q_x0, q_y0, q_z0, q_x1, q_y1, q_z1 = bbox_coords(bbox)
+        q_x0 -= tolerance
+        q_y0 -= tolerance
+        q_z0 -= tolerance
+        q_x1 += tolerance
+        q_y1 += tolerance
+        q_z1 += tolerance
+        boxes = self.boxes
+        found = []
+        for key in self._candidates((q_x0, q_y0, q_z0, q_x1, q_y1, q_z1), 0.0):
+            x0, y0, z0, x1, y1, z1 = boxes[key]
+            if x0 <= q_x1 and x1 >= q_x0 and y0 <= q_y1 and y1 >= q_y0 and z0 <= q_z1 and z1 >= q_z0:
+                found.append(key)
+        return self._sorted(found)
+
+    def contained(self, bbox, tolerance=0.0):
+        """
+        Retrieves keys of boxes inside bbox, like
+        BoundingBoxIsInsideFilter(Outline(bbox), tolerance).
+        :param bbox: BoundingBox or six float tuple
+        :param tolerance: float in ft
+        :return: list of keys in insertion order
+        """
+        q_x0, q_y0, q_z0, q_x1, q_y1, q_z1 = bbox_coords(bbox)
+        q_x0 -= tolerance
+        q_y0 -= tolerance
+        q_z0 -= tolerance
+        q_x1 += tolerance
+        q_y1 += tolerance
+        q_z1 += tolerance
+        boxes = self.boxes
+        found = []
+        for key in self._candidates((q_x0, q_y0, q_z0, q_x1, q_y1, q_z1), 0.0):
+            x0, y0, z0, x1, y1, z1 = boxes[key]
+            if x0 >= q_x0 and x1 <= q_x1 and y0 >= q_y0 and y1 <= q_y1 and z0 >= q_z0 and z1 <= q_z1:
+                found.append(key)
+        return self._sorted(found)
+
+    def nearest(self, target, k=1, max_distance=None):
+        """
+        Retrieves the k nearest boxes to a point or bbox.
+        Distance is 0.0 for boxes touching or containing the target.
+        :param target: XYZ / three float tuple or BoundingBox / six float tuple
+        :param k: amount of results
+        :param max_distance: optional search radius in ft
+        :return: list of (distance, key) sorted by distance
+        """
+        coords = _target_coords(target)
+        if not self.boxes or k < 1:
+            return []
+        extent = self.bounds()
+        reach = max(
+            max(coords[axis + 3], extent[axis + 3]) - min(coords[axis], extent[axis])
+            for axis in range(3)
+        ) * sqrt(3.0)
+        if max_distance is not None:
+            reach = min(reach, max_distance)
+        radius = min(self.cell_size, reach)
+        while True:
+            found = []
+            for key in self._candidates(coords, radius):
+                distance = box_distance(coords, self.boxes[key])
+                if distance <= radius:
+                    found.append((distance, self._order[key], key))
+            if len(found) >= k or radius >= reach:
+                found.sort()
+                return [(distance, key) for distance, order, key in found[:k]]
+            radius = min(radius * 2.0, reach)
+
+    def bounds(self):
+        """
+        Retrieves the union coordinates of all indexed boxes.
+        :return: tuple or None if empty
+        """
+        if not self.boxes:
+            return None
+        boxes = list(self.boxes.values())
+        return (
+            tuple(min(coords[axis] for coords in boxes) for axis in range(3)) +
+            tuple(max(coords[axis] for coords in boxes) for axis in range(3, 6))
+        )
+
+
+def mean_extent(boxes):
+    """
+    Retrieves the mean of the largest edge length of boxes.
+    :param boxes: iterable of six float tuples
+    :return: float or None if empty
+    """
+    total = 0.0
+    count = 0
+    for x0, y0, z0, x1, y1, z1 in boxes:
+        total += max(x1 - x0, y1 - y0, z1 - z0)
+        count += 1
+    if count:
+        return total / count
+
+
+def box_distance(coords_a, coords_b):
+    """
+    Retrieves the euclidean gap between two boxes.
+    :param coords_a: six float tuple
+    :param coords_b: six float tuple
+    :return: float: 0.0 if they touch or overlap
+    """
+    squared = 0.0
+    for axis in range(3):
+        gap = max(coords_b[axis] - coords_a[axis + 3], coords_a[axis] - coords_b[axis + 3], 0.0)
+        squared += gap * gap
+    return sqrt(squared)
+
+
+def _target_coords(target):
+    if hasattr(target, "X"):
+        return target.X, target.Y, target.Z, target.X, target.Y, target.Z
+    coords = bbox_coords(target)
+    if len(coords) == 3:
+        return coords + coords
+    return coords
+
+
+def _range_count(ranges):
+    count = 1
+    for start, end in ranges:
+        count *= end - start + 1
+    return count
+
+
+def _iter_cells(ranges):
+    (x0, x1), (y0, y1), (z0, z1) = ranges
+    for cx in range(x0, x1 + 1):
+        for cy in range(y0, y1 + 1):
+            for cz in range(z0, z1 + 1):
+                yield cx, cy, cz
@@ -0,0 +1,180 @@
+"""
+Micro benchmarks of the rph.bbx and rph.param core helpers
+on synthetic data, runs on plain CPython via fake_revit.
+Writes best-of-repeat timings per case and size to json,
+optionally compared against the json of an earlier run:
+
+    python benchmarks/bench_rph.py --sizes 1000 10000 --out bench.json
+    python benchmarks/bench_rph.py --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+from collections import OrderedDict
+from datetime import datetime
+from timeit import default_timer
+
+import fake_revit
+
+DB = fake_revit.install()
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "RevitPythonHelper.lib"))
+
+from rph import bbx, param
+
+PARAMS_PER_ELEMENT = 50
+# distinct fake elements are ~20KB each, larger sizes reuse them
+ELEMENT_POOL_SIZE = 2000
+DEFAULT_SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+
+
+def random_bbox(rnd, extent=1000.0, size=5.0):
+    bbox = DB.BoundingBoxXYZ()
+    x, y, z = rnd.uniform(0, extent), rnd.uniform(0, extent), rnd.uniform(0, extent / 10)
+    bbox.Min = DB.XYZ(x, y, z)
+    bbox.Max = DB.XYZ(x + rnd.uniform(0.1, size), y + rnd.uniform(0.1, size), z + rnd.uniform(0.1, size))
+    return bbox
+
+
+def random_element(rnd):
+    parameters = []
+    for idx in range(PARAMS_PER_ELEMENT):
+        kind = idx % 4
+        name = "param_{:02d}".format(idx)
+        if kind == 0:
+            parameters.append(DB.Parameter(name, DB.StorageType.String, "value_{}".format(rnd.randint(0, 20))))
+        elif kind == 1:
+            parameters.append(DB.Parameter(name, DB.StorageType.Integer, rnd.randint(0, 1)))
+        elif kind == 2:
+            parameters.append(DB.Parameter(name, DB.StorageType.Double, rnd.uniform(0, 10), shared=True))
+        else:
+            parameters.append(DB.Parameter(name, DB.StorageType.ElementId, DB.ElementId(rnd.randint(1, 99))))
+    return fake_revit.Element(parameters)
+
+
+def setup_bboxes(size, rnd):
+    return [random_bbox(rnd) for _ in range(size)]
+
+
+def setup_bbox_pairs(size, rnd):
+    return [(random_bbox(rnd, extent=10.0), random_bbox(rnd, extent=10.0)) for _ in range(size)]
+
+
+def setup_points(size, rnd):
+    return [DB.XYZ(rnd.uniform(0, 100), rnd.uniform(0, 100), rnd.uniform(0, 10)) for _ in range(size)]
+
+
+def setup_elements(size, rnd):
+    pool = [random_element(rnd) for _ in range(min(size, ELEMENT_POOL_SIZE))]
+    return [pool[idx % len(pool)] for idx in range(size)]
+
+
+def run_get_val(elements):
+    names = ["param_{:02d}".format(idx) for idx in (0, 13, 26, 49)]
+    for idx, elem in enumerate(elements):
+        param.get_val(elem, names[idx % 4])
+
+
+def run_collect_infos(elements):
+    for elem in elements:
+        param.collect_infos(elem)
+
+
+def run_read_many(elements):
+    param.read_many(elements, ["param_{:02d}".format(idx) for idx in (0, 13, 26, 49)])
+
+
+def run_overlaps(pairs):
+    for bbox_a, bbox_b in pairs:
+        bbx.bboxes_overlap(bbox_a, bbox_b)
+
+
+def run_intersections(pairs):
+    for bbox_a, bbox_b in pairs:
+        bbx.get_bbox_intersection(bbox_a, bbox_b)
+
+
+CASES = OrderedDict([
+    ("bbx.get_combined_bbox",     (setup_bboxes,         bbx.get_combined_bbox)),
+    ("bbx.bboxes_overlap",        (setup_bbox_pairs,     run_overlaps)),
+    ("bbx.get_bbox_intersection", (setup_bbox_pairs,     run_intersections)),
+    ("bbx.get_bbx_from_pts",      (setup_points,         bbx.get_bbx_from_pts)),
+    ("bbx.BoxArray.union",        (setup_bboxes,         lambda boxes: bbx.BoxArray.from_bboxes(boxes).union())),
+    ("bbx.overlapping_pairs",     (setup_bboxes,         bbx.overlapping_pairs)),
+    ("param.get_val",             (setup_elements,       run_get_val)),
+    ("param.read_many",           (setup_elements,       run_read_many)),
+    ("param.collect_infos",       (setup_elements,       run_collect_infos)),
+])
+
+
+def time_case(setup, run, size, repeat, seed):
+    data = setup(size, random.Random(seed))
+    best = None
+    for _ in range(repeat):
+        start = default_timer()
+        run(data)
+        elapsed = default_timer() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def run_benchmarks(case_names, sizes, repeat, seed):
+    results = OrderedDict()
+    for name in case_names:
+        setup, run = CASES[name]
+        results[name] = OrderedDict()
+        for size in sizes:
+            seconds = time_case(setup, run, size, repeat, seed)
+            results[name][str(size)] = seconds
+            print("{:<28} {:>9} {:>12.6f}s".format(name, size, seconds))
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)["results"]
+    print(70 * "-")
+    print("compared to: {}".format(baseline_path))
+    for name, timings in results.items():
+        for size, seconds in timings.items():
+            before = baseline.get(name, {}).get(size)
+            if not before:
+                continue
+            print("{:<28} {:>9} {:>12.6f}s -> {:>12.6f}s  x{:.2f}".format(
+                name, size, before, seconds, before / seconds if seconds else float("inf")))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_rph_{}.json".format(datetime.now().strftime("%Y%m%d_%H%M")))
+    parser.add_argument("--compare", help="json of an earlier run")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.cases, args.sizes, args.repeat, args.seed)
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(),
+            "python": sys.version,
+            "platform": platform.platform(),
+            "numpy": bbx.np.__version__ if bbx.np else None,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as out_file:
+        json.dump(report, out_file, indent=2)
+    print("written: {}".format(args.out))
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
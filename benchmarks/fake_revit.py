@@ -0,0 +1,236 @@
+"""
+Lightweight stand-ins for the Revit API objects used by rph,
+so rph.bbx and rph.param can be benchmarked on plain CPython.
+install() registers them as Autodesk.Revit.DB and rpw modules
+and points the rph cache dir to a temp dir.
+Only the members rph touches are modelled.
+"""
+import os
+import sys
+import tempfile
+import types
+from itertools import count
+
+
+class _Enum(object):
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, member):
+        if member.startswith("_"):
+            raise AttributeError(member)
+        value = _EnumMember(self._name, member)
+        setattr(self, member, value)
+        return value
+
+
+class _EnumMember(object):
+    def __init__(self, enum_name, name):
+        self.enum_name = enum_name
+        self.name = name
+
+    def ToString(self):
+        return self.name
+
+    def __repr__(self):
+        return "{}.{}".format(self.enum_name, self.name)
+
+
+BuiltInParameter = _Enum("BuiltInParameter")
+BuiltInCategory = _Enum("BuiltInCategory")
+StorageType = _Enum("StorageType")
+
+
+class XYZ(object):
+    __slots__ = ("X", "Y", "Z")
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.X = x
+        self.Y = y
+        self.Z = z
+
+    def ToString(self):
+        return "({}, {}, {})".format(self.X, self.Y, self.Z)
+
+
+class BoundingBoxXYZ(object):
+    def __init__(self):
+        self.Min = XYZ()
+        self.Max = XYZ()
+
+
+class ElementId(object):
+    __slots__ = ("IntegerValue",)
+
+    def __init__(self, value):
+        self.IntegerValue = value
+
+    def __eq__(self, other):
+        return isinstance(other, ElementId) and other.IntegerValue == self.IntegerValue
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.IntegerValue)
+
+    def ToString(self):
+        return str(self.IntegerValue)
+
+
+ElementId.InvalidElementId = ElementId(-1)
+
+
+class Definition(object):
+    def __init__(self, name, bip=None):
+        self.Name = name
+        self.BuiltInParameter = bip or BuiltInParameter.INVALID
+
+    # Revit matches definitions by id, not by instance
+    def __eq__(self, other):
+        return isinstance(other, Definition) and other.Name == self.Name
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.Name)
+
+
+class Parameter(object):
+    def __init__(self, name, storage_type, value, shared=False, read_only=False, bip=None):
+        self.Definition = Definition(name, bip)
+        self.StorageType = storage_type
+        self.value = value
+        self.HasValue = value is not None
+        self.IsShared = shared
+        self.IsReadOnly = read_only
+        self.GUID = "guid-{}".format(name) if shared else None
+
+    def AsString(self):
+        return self.value
+
+    def AsInteger(self):
+        return self.value
+
+    def AsDouble(self):
+        return self.value
+
+    def AsElementId(self):
+        return self.value
+
+    def AsValueString(self):
+        if self.StorageType is StorageType.Double:
+            return "{:.0f}".format(self.value * 304.8)
+        return str(self.value)
+
+    def Set(self, value):
+        self.value = value
+        self.HasValue = True
+        return True
+
+
+class Element(object):
+    _ids = count(1)
+    registry = {}
+
+    def __init__(self, parameters, type_id=None):
+        self.Id = ElementId(next(self._ids))
+        self.UniqueId = "uid-{}".format(self.Id.IntegerValue)
+        self.Parameters = parameters
+        self.Category = None
+        self.Document = None
+        self._type_id = type_id or ElementId.InvalidElementId
+        self.registry[self.Id.IntegerValue] = self
+        self._by_key = {}
+        for param in parameters:
+            self._by_key[param.Definition] = param
+            if param.IsShared:
+                self._by_key[param.GUID] = param
+            if param.Definition.BuiltInParameter is not BuiltInParameter.INVALID:
+                self._by_key[param.Definition.BuiltInParameter] = param
+
+    def LookupParameter(self, name):
+        # Revit searches the parameter set linearly by display name
+        for param in self.Parameters:
+            if param.Definition.Name == name:
+                return param
+
+    def get_Parameter(self, key):
+        return self._by_key.get(key)
+
+    def GetTypeId(self):
+        return self._type_id
+
+    def get_BoundingBox(self, view):
+        return None
+
+
+class LabelUtils(object):
+    @staticmethod
+    def GetLabelFor(bip):
+        return bip.name.replace("_", " ").title()
+
+
+class _Application(object):
+    VersionNumber = "fake"
+    Language = _EnumMember("LanguageType", "English_USA")
+
+
+class _Document(object):
+    Application = _Application()
+
+    def GetElement(self, elem_id):
+        return Element.registry.get(elem_id.IntegerValue)
+
+
+class _Transaction(object):
+    def __init__(self, name=None):
+        self.name = name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+def install():
+    """
+    Registers the fake modules, has to run before importing rph.
+    Redirects APPDATA, so no fake cache file ends up
+    in the cache dir used by Revit sessions.
+    :return: the fake Autodesk.Revit.DB module
+    """
+    os.environ["APPDATA"] = tempfile.mkdtemp(prefix="fake_revit_")
+    db_module = types.ModuleType("Autodesk.Revit.DB")
+    for name, value in (
+        ("BuiltInParameter", BuiltInParameter),
+        ("BuiltInCategory", BuiltInCategory),
+        ("StorageType", StorageType),
+        ("XYZ", XYZ),
+        ("BoundingBoxXYZ", BoundingBoxXYZ),
+        ("ElementId", ElementId),
+        ("Parameter", Parameter),
+        ("LabelUtils", LabelUtils),
+    ):
+        setattr(db_module, name, value)
+    autodesk = types.ModuleType("Autodesk")
+    revit = types.ModuleType("Autodesk.Revit")
+    autodesk.Revit = revit
+    revit.DB = db_module
+
+    rpw = types.ModuleType("rpw")
+    rpw.DB = db_module
+    rpw.doc = _Document()
+    rpw.db = types.ModuleType("rpw.db")
+    rpw.db.Transaction = _Transaction
+
+    sys.modules.update({
+        "Autodesk": autodesk,
+        "Autodesk.Revit": revit,
+        "Autodesk.Revit.DB": db_module,
+        "rpw": rpw,
+        "rpw.db": rpw.db,
+    })
+    return db_module
@@ -4,7 +4,7 @@ set Aufschlagrichtung_DIN parameter on all appropriate doors
 from Autodesk.Revit.DB import BuiltInCategory as Bic
 from Autodesk.Revit.DB import FilteredElementCollector as Fec
 from System.Diagnostics import Stopwatch
-from rpw import doc, db
+from rpw import doc
 from rph import param
 
 stopwatch = Stopwatch()
@@ -32,35 +32,39 @@ mirrored_hinges_side = {
 }
 doors = Fec(doc).OfCategory(Bic.OST_Doors).WhereElementIsNotElementType().ToElements()
 
-with db.Transaction('doors Aufschlagrichtung_DIN'):
-    for door in doors:
-        default_hinges_side = param.get_val(door.Symbol, family_hinges_side)
-        default_hinges_side = default_hinges_side.split("_")[-1]
-        if not default_hinges_side:
-            continue
+param_writer = param.ParamWriter()
 
-        door_type = doc.GetElement(door.GetTypeId())
-        door_instance_is_mirrored = door.Mirrored
-        print("________\ndoor_id: {} family hinges side: {}".format(
-            door.Id, default_hinges_side))
+for door in doors:
+    default_hinges_side = param.get_val(door.Symbol, family_hinges_side)
+    default_hinges_side = default_hinges_side.split("_")[-1]
+    if not default_hinges_side:
+        continue
 
-        if door_instance_is_mirrored:
-            side_value_DIN =          hinges_side.get(default_hinges_side) or ""
-            print("is mirrored, instance hinges side: {}".format(side_value_DIN))
+    door_type = doc.GetElement(door.GetTypeId())
+    door_instance_is_mirrored = door.Mirrored
+    print("________\ndoor_id: {} family hinges side: {}".format(
+        door.Id, default_hinges_side))
 
-        else:
-            side_value_DIN = mirrored_hinges_side.get(default_hinges_side) or ""
-            print("not mirrored, instance hinges side: {}".format(side_value_DIN))
+    if door_instance_is_mirrored:
+        side_value_DIN =          hinges_side.get(default_hinges_side) or ""
+        print("is mirrored, instance hinges side: {}".format(side_value_DIN))
 
-        param.set_val(door, instance_hinges_side_DIN, side_value_DIN)
-        param.set_val(door, rvt_id, str(door.Id.IntegerValue))
+    else:
+        side_value_DIN = mirrored_hinges_side.get(default_hinges_side) or ""
+        print("not mirrored, instance hinges side: {}".format(side_value_DIN))
 
-        if door.Host:
-            host_type = doc.GetElement(door.Host.GetTypeId())
-            host_wall_description = param.get_val(host_type, "Description")
-            if host_wall_description:
-                print(host_wall_description)
-                param.set_val(door, "Wandtyp", host_wall_description)
+    param_writer.queue(door, instance_hinges_side_DIN, side_value_DIN)
+    param_writer.queue(door, rvt_id, str(door.Id.IntegerValue))
+
+    if door.Host:
+        host_type = doc.GetElement(door.Host.GetTypeId())
+        host_wall_description = param.get_val(host_type, "Description")
+        if host_wall_description:
+            print(host_wall_description)
+            param_writer.queue(door, "Wandtyp", host_wall_description)
+
+param_writer.apply('doors Aufschlagrichtung_DIN')
+param_writer.print_report()
 
 print("{} updated in: ".format(__file__))
 
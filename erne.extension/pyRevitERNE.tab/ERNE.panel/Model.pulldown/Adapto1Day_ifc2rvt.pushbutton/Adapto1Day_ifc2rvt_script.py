@@ -129,10 +129,10 @@ def redraw_doubled_wall_from_split_huells(wall_huell1, wall_huell2, wall_type_id
     wall1_guid = param.get_val(wall_huell1, "IfcGUID")
     wall2_guid = param.get_val(wall_huell2, "IfcGUID")
     wall_guids = "{}::split::{}".format(wall1_guid, wall2_guid)
-    wall1_bbox = wall_huell1.get_BoundingBox(None)
-    wall2_bbox = wall_huell2.get_BoundingBox(None)
-    bbox_bottom_offset = wall1_bbox.Min.Z - doc.GetElement(wall_lvl_id).Elevation
-    combined_bbox = bbx.get_combined_bbox([wall1_bbox, wall2_bbox])
+    wall1_bbox = bbx.AABB.from_bbox(bbox_cache.get(wall_huell1))
+    wall2_bbox = bbx.AABB.from_bbox(bbox_cache.get(wall_huell2))
+    bbox_bottom_offset = wall1_bbox.min_z - doc.GetElement(wall_lvl_id).Elevation
+    combined_bbox = wall1_bbox.union(wall2_bbox)
     combined_info = get_bbox_info(combined_bbox)
     wall_type = doc.GetElement(wall_type_id)
     print(wall_type.get_Parameter(Bip.WALL_ATTR_WIDTH_PARAM).AsDouble(), combined_info["width"])
@@ -189,53 +189,72 @@ def redraw_door_window_from_huell(huell, fam_type, wall, offset=0.0):
 def get_wall_pairs(wall_bboxes_by_id):
     threshold = 0.65616 # ~200mm
     matches = {}
-    for eid1, wall_bbx1 in wall_bboxes_by_id.items():
-        for eid2, wall_bbx2 in wall_bboxes_by_id.items():
-            if eid1 == eid2:
+    matched_ids = set()
+    wall_ids = list(wall_bboxes_by_id.keys())
+    wall_infos = {}
+    # walls with all coordinates within threshold overlap when grown by it,
+    # so the sweep yields a superset of candidates for the exact checks below
+    wall_bboxes = [wall_bboxes_by_id[eid] for eid in wall_ids]
+    wall_bbox_pairs = bbx.overlapping_pairs(wall_bboxes, 2 * threshold)
+    overlap_volumes, overlap_ratios = bbx.overlap_metrics(wall_bboxes, wall_bbox_pairs)
+    candidates = defaultdict(list)
+    for (idx1, idx2), ratio in zip(wall_bbox_pairs, overlap_ratios):
+        candidates[idx1].append((ratio, idx2))
+        candidates[idx2].append((ratio, idx1))
+    for idx1, eid1 in enumerate(wall_ids):
+        wall_bbx1 = wall_bboxes_by_id[eid1]
+        # most overlapping candidate first: doubled wall huells before touching neighbours
+        for ratio, idx2 in sorted(candidates[idx1], key=lambda cand: (-cand[0], cand[1])):
+            eid2 = wall_ids[idx2]
+            wall_bbx2 = wall_bboxes_by_id[eid2]
+            if eid1 in matches:
                 continue
-            if eid1 in matches.keys():
-                continue
-            if eid1 in matches.values():
+            if eid1 in matched_ids:
                 continue
             #print(35*"-")
             #print(eid1, eid2)
-            wall_bbx1_info = get_bbox_info(wall_bbx1)
-            wall_bbx2_info = get_bbox_info(wall_bbx2)
+            if eid1 not in wall_infos:
+                wall_infos[eid1] = get_bbox_info(wall_bbx1)
+            if eid2 not in wall_infos:
+                wall_infos[eid2] = get_bbox_info(wall_bbx2)
+            wall_bbx1_info = wall_infos[eid1]
+            wall_bbx2_info = wall_infos[eid2]
             # direction same
             if wall_bbx1_info["dir"] != wall_bbx2_info["dir"]:
                 #print("NO: different direction: {}::{}".format(wall_bbx1_info["dir"], wall_bbx2_info["dir"]))
                 continue
             # z height
-            if abs(wall_bbx1.Min.Z - wall_bbx2.Min.Z) > threshold:
-                #print("NO: low_to_far: {}".format(abs(wall_bbx1.Min.Z - wall_bbx2.Min.Z)))
+            if abs(wall_bbx1.min_z - wall_bbx2.min_z) > threshold:
+                #print("NO: low_to_far: {}".format(abs(wall_bbx1.min_z - wall_bbx2.min_z)))
                 continue
-            if abs(wall_bbx1.Max.Z - wall_bbx2.Max.Z) > threshold:
-                #print("NO: high_to_far: {}".format(abs(wall_bbx1.Max.Z - wall_bbx2.Max.Z)))
+            if abs(wall_bbx1.max_z - wall_bbx2.max_z) > threshold:
+                #print("NO: high_to_far: {}".format(abs(wall_bbx1.max_z - wall_bbx2.max_z)))
                 continue
             # x location
-            if abs(wall_bbx1.Min.X - wall_bbx2.Min.X) > threshold:
-                #print("NO: xmin_to_far: {}".format(abs(wall_bbx1.Min.X - wall_bbx2.Min.X)))
+            if abs(wall_bbx1.min_x - wall_bbx2.min_x) > threshold:
+                #print("NO: xmin_to_far: {}".format(abs(wall_bbx1.min_x - wall_bbx2.min_x)))
                 continue
-            if abs(wall_bbx1.Max.X - wall_bbx2.Max.X) > threshold:
-                #print("NO: xmax_to_far: {}".format(abs(wall_bbx1.Max.X - wall_bbx2.Max.X)))
+            if abs(wall_bbx1.max_x - wall_bbx2.max_x) > threshold:
+                #print("NO: xmax_to_far: {}".format(abs(wall_bbx1.max_x - wall_bbx2.max_x)))
                 continue
             # y location
-            if abs(wall_bbx1.Min.Y - wall_bbx2.Min.Y) > threshold:
-                #print("NO: ymin_to_far: {}".format(abs(wall_bbx1.Min.Y - wall_bbx2.Min.Y)))
+            if abs(wall_bbx1.min_y - wall_bbx2.min_y) > threshold:
+                #print("NO: ymin_to_far: {}".format(abs(wall_bbx1.min_y - wall_bbx2.min_y)))
                 continue
-            if abs(wall_bbx1.Max.Y - wall_bbx2.Max.Y) > threshold:
-                #("NO: ymax_to_far: {}".format(abs(wall_bbx1.Max.Y - wall_bbx2.Max.Y)))
+            if abs(wall_bbx1.max_y - wall_bbx2.max_y) > threshold:
+                #("NO: ymax_to_far: {}".format(abs(wall_bbx1.max_y - wall_bbx2.max_y)))
                 continue
             #print(
-            #    abs(wall_bbx1.Min.Z - wall_bbx2.Min.Z),
-            #    abs(wall_bbx1.Max.Z - wall_bbx2.Max.Z),
-            #    abs(wall_bbx1.Min.X - wall_bbx2.Min.X),
-            #    abs(wall_bbx1.Max.X - wall_bbx2.Max.X),
-            #    abs(wall_bbx1.Min.Y - wall_bbx2.Min.Y),
-            #    abs(wall_bbx1.Max.Y - wall_bbx2.Max.Y),
+            #    abs(wall_bbx1.min_z - wall_bbx2.min_z),
+            #    abs(wall_bbx1.max_z - wall_bbx2.max_z),
+            #    abs(wall_bbx1.min_x - wall_bbx2.min_x),
+            #    abs(wall_bbx1.max_x - wall_bbx2.max_x),
+            #    abs(wall_bbx1.min_y - wall_bbx2.min_y),
+            #    abs(wall_bbx1.max_y - wall_bbx2.max_y),
             #)
             print(eid1, eid2)
             matches[eid1] = eid2
+            matched_ids.add(eid2)
     matched_walls = [(doc.GetElement(ElementId(k)), doc.GetElement(ElementId(v))) for k, v in matches.items()]
     print("found {} matches".format(len(matches)))
     return matched_walls
@@ -312,136 +331,148 @@ doors   = Fec(doc).OfCategory(Bic.OST_Doors  ).WhereElementIsNotElementType().To
 windows = Fec(doc).OfCategory(Bic.OST_Windows).WhereElementIsNotElementType().ToElements()
 floors  = Fec(doc).OfCategory(Bic.OST_Floors ).WhereElementIsNotElementType().ToElements()
 
-wall_bboxes_by_id   = {wa.Id.IntegerValue:wa.get_BoundingBox(None) for wa in walls}
-door_bboxes_by_id   = {do.Id.IntegerValue:do.get_BoundingBox(None) for do in doors}
-window_bboxes_by_id = {wi.Id.IntegerValue:wi.get_BoundingBox(None) for wi in windows}
-
-door_ids   = List[ElementId]([ElementId(eid_int) for eid_int in door_bboxes_by_id  ])
-window_ids = List[ElementId]([ElementId(eid_int) for eid_int in window_bboxes_by_id])
-
-door_types = Fec(doc).OfCategory(Bic.OST_Doors).WhereElementIsElementType().ToElements()
-door_types_by_fam_type_name = {
-    "{}::{}".format(dt.FamilyName, dt.get_Parameter(Bip.ALL_MODEL_TYPE_NAME).AsString()):dt for dt in door_types
-}
-
-window_types = Fec(doc).OfCategory(Bic.OST_Windows).WhereElementIsElementType().ToElements()
-window_types_by_fam_type_name = {
-    "{}::{}".format(wt.FamilyName, wt.get_Parameter(Bip.ALL_MODEL_TYPE_NAME).AsString()):wt for wt in window_types
-}
-
-wall_types = Fec(doc).OfCategory(Bic.OST_Walls).WhereElementIsElementType().ToElements()
-wall_types_by_type_name = {
-    wt.get_Parameter(Bip.ALL_MODEL_TYPE_NAME).AsString():wt for wt in wall_types
-}
-
-FT_MM = 304.8
-NON_STRUCTURAL = False
-
-double_wall_type_id = wall_types_by_type_name["IW 240 FA AA CC Modultrennwand doppelt"].Id
-
-cx_cats = {
-    "doors"  : {
-        "bic"      : Bic.OST_Doors,
-        "types"    : door_types_by_fam_type_name,
-        "inst_ids" : door_ids,
-        "drawn_ids": [],
-    },
-    "windows": {
-        "bic"      : Bic.OST_Windows,
-        "types"    : window_types_by_fam_type_name,
-        "inst_ids" : window_ids,
-        "drawn_ids": [],
-    },
-}
-
-print("found {} wall bboxes".format(len(wall_bboxes_by_id)))
-
-
-with db.Transaction("redraw_paired_walls_doors_windows"):
-    wall_pairs = get_wall_pairs(wall_bboxes_by_id)
-    for wall1, wall2 in wall_pairs:
-        redraw_doubled_wall_from_split_huells(wall1, wall2, double_wall_type_id)
-
-    doc.Regenerate()
-
-walls = Fec(doc).OfCategory(Bic.OST_Walls  ).WhereElementIsNotElementType().ToElements()
-wall_bboxes_by_id = {wa.Id.IntegerValue:wa.get_BoundingBox(None) for wa in walls}
-
-
-with db.Transaction("redraw_wall_and_door"):
-    for eid, wall_bbx in wall_bboxes_by_id.items():
-        wall = doc.GetElement(ElementId(eid))
-        if wall.LevelId.IntegerValue == -1:
-            print("{} skipped mip-ds-wall".format(eid))
-            continue
-        print(55*"=")
-        print(eid)
-        redraw_wall_huell_contained_elems(wall, wall_bbx)
-
-
-with db.Transaction("add_rooms"):
-    for lvl in levels:
-        if lvl.Name == "zero":
-            continue
-        param.set_val(lvl, "level_compute_height", 3.0, bip=True)
-        added_rooms = doc.Create.NewRooms2(lvl)
-        print("added {} rooms on level: {}".format(
-            len(added_rooms),
-            lvl.Name
-        ))
+# bboxes of elements changed by the transactions below are dropped on commit
+with bbx.BBoxCache(doc) as bbox_cache:
+    # walls without geometry have no bbox and are not paired
+    wall_bboxes_by_id   = {
+        eid_int:bbx.AABB.from_bbox(wall_bbox) for eid_int, wall_bbox in
+        ((wa.Id.IntegerValue, bbox_cache.get(wa)) for wa in walls) if wall_bbox
+    }
+    door_bboxes_by_id   = {do.Id.IntegerValue:bbox_cache.get(do) for do in doors}
+    window_bboxes_by_id = {wi.Id.IntegerValue:bbox_cache.get(wi) for wi in windows}
+
+    door_ids   = List[ElementId]([ElementId(eid_int) for eid_int in door_bboxes_by_id  ])
+    window_ids = List[ElementId]([ElementId(eid_int) for eid_int in window_bboxes_by_id])
+
+    door_types = Fec(doc).OfCategory(Bic.OST_Doors).WhereElementIsElementType().ToElements()
+    door_types_by_fam_type_name = {
+        "{}::{}".format(dt.FamilyName, dt.get_Parameter(Bip.ALL_MODEL_TYPE_NAME).AsString()):dt for dt in door_types
+    }
+
+    window_types = Fec(doc).OfCategory(Bic.OST_Windows).WhereElementIsElementType().ToElements()
+    window_types_by_fam_type_name = {
+        "{}::{}".format(wt.FamilyName, wt.get_Parameter(Bip.ALL_MODEL_TYPE_NAME).AsString()):wt for wt in window_types
+    }
+
+    wall_types = Fec(doc).OfCategory(Bic.OST_Walls).WhereElementIsElementType().ToElements()
+    wall_types_by_type_name = {
+        wt.get_Parameter(Bip.ALL_MODEL_TYPE_NAME).AsString():wt for wt in wall_types
+    }
+
+    FT_MM = 304.8
+    NON_STRUCTURAL = False
+
+    double_wall_type_id = wall_types_by_type_name["IW 240 FA AA CC Modultrennwand doppelt"].Id
+
+    cx_cats = {
+        "doors"  : {
+            "bic"      : Bic.OST_Doors,
+            "types"    : door_types_by_fam_type_name,
+            "inst_ids" : door_ids,
+            "drawn_ids": [],
+        },
+        "windows": {
+            "bic"      : Bic.OST_Windows,
+            "types"    : window_types_by_fam_type_name,
+            "inst_ids" : window_ids,
+            "drawn_ids": [],
+        },
+    }
+
+    print("found {} wall bboxes".format(len(wall_bboxes_by_id)))
+
+
+    with db.Transaction("redraw_paired_walls_doors_windows"):
+        wall_pairs = get_wall_pairs(wall_bboxes_by_id)
+        for wall1, wall2 in wall_pairs:
+            redraw_doubled_wall_from_split_huells(wall1, wall2, double_wall_type_id)
 
+        doc.Regenerate()
 
-windows = Fec(doc).OfCategory(Bic.OST_Windows).WhereElementIsNotElementType().ToElements()
-windows_direction = "ToRoom"  # "FromRoom"
-
-with db.Transaction("correct window flip direction"):
-    for window in windows:
-        window_id = window.Id
-        print("________\nwindow_id: {}".format(window_id))
-        window_phase = doc.GetElement(window.CreatedPhaseId)
-        window_room = getattr(window, windows_direction)[window_phase]
-        if window_room:
-            # print("window correct")
-            pass
-        else:
-            print("window not correct yet flipping it.")
-            window.flipFacing()
+    walls = Fec(doc).OfCategory(Bic.OST_Walls  ).WhereElementIsNotElementType().ToElements()
+    # BoundingBoxXYZ here, redraw_wall_huell_contained_elems builds an Outline from it
+    redrawn_wall_bboxes_by_id = {wa.Id.IntegerValue:bbox_cache.get(wa) for wa in walls}
 
 
-floors  = Fec(doc).OfCategory(Bic.OST_Floors ).WhereElementIsNotElementType().ToElements()
+    with db.Transaction("redraw_wall_and_door"):
+        for eid, wall_bbx in redrawn_wall_bboxes_by_id.items():
+            if not wall_bbx:
+                print("{} skipped wall without bbox".format(eid))
+                continue
+            wall = doc.GetElement(ElementId(eid))
+            if wall.LevelId.IntegerValue == -1:
+                print("{} skipped mip-ds-wall".format(eid))
+                continue
+            print(55*"=")
+            print(eid)
+            redraw_wall_huell_contained_elems(wall, wall_bbx)
 
-floors_by_lvl_offset = defaultdict(list)
-for floor in floors:
-    floor_id = floor.Id
-    floor_lvl_id = floor.LevelId
-    print("________\nfloor_id: {}".format(floor_id))
-    floor_lvl_offset = floor.get_Parameter(Bip.FLOOR_HEIGHTABOVELEVEL_PARAM).AsDouble()
-    key = "{}_{}".format(floor_lvl_id, floor_lvl_offset)
-    floors_by_lvl_offset[key].append({
-        "floor": floor,
-        "id": floor_id,
-        "bbox": floor.get_BoundingBox(None),
-    })
-
-with db.Transaction("join floors"):
-    for k, lvl_floors_infos in floors_by_lvl_offset.items():
-        print("________\nfloor_infos: {}".format(k))
-        for info in lvl_floors_infos:
-            floor = info["floor"]
-            floor_id = info["id"]
-            other_floor_ids = [i["id"] for i in lvl_floors_infos if not i["id"] == floor_id]
-            other_lvl_floor_ids = List[ElementId](other_floor_ids)
-            bbox = info["bbox"]
-            floor_outline = Outline(bbox.Min, bbox.Max)
-            bbox_filter = BoundingBoxIntersectsFilter(floor_outline, 0.03)
-            cx_floors = Fec(doc, other_lvl_floor_ids).OfCategory(Bic.OST_Floors).WherePasses(bbox_filter).ToElements()
-            print("cx_floors: {}".format(cx_floors))
-            for cx_floor in cx_floors:
-                already_joined = JoinGeometryUtils.AreElementsJoined(doc, floor, cx_floor)
-                if not already_joined:
-                    print("joining: {} with {}".format(floor.Id, cx_floor.Id))
-                    JoinGeometryUtils.JoinGeometry(doc, floor, cx_floor)
 
+    with db.Transaction("add_rooms"):
+        for lvl in levels:
+            if lvl.Name == "zero":
+                continue
+            param.set_val(lvl, "level_compute_height", 3.0, bip=True)
+            added_rooms = doc.Create.NewRooms2(lvl)
+            print("added {} rooms on level: {}".format(
+                len(added_rooms),
+                lvl.Name
+            ))
+
+
+    windows = Fec(doc).OfCategory(Bic.OST_Windows).WhereElementIsNotElementType().ToElements()
+    windows_direction = "ToRoom"  # "FromRoom"
+
+    with db.Transaction("correct window flip direction"):
+        for window in windows:
+            window_id = window.Id
+            print("________\nwindow_id: {}".format(window_id))
+            window_phase = doc.GetElement(window.CreatedPhaseId)
+            window_room = getattr(window, windows_direction)[window_phase]
+            if window_room:
+                # print("window correct")
+                pass
+            else:
+                print("window not correct yet flipping it.")
+                window.flipFacing()
+
+
+    floors  = Fec(doc).OfCategory(Bic.OST_Floors ).WhereElementIsNotElementType().ToElements()
+
+    floors_by_lvl_offset = defaultdict(list)
+    for floor in floors:
+        floor_id = floor.Id
+        floor_lvl_id = floor.LevelId
+        print("________\nfloor_id: {}".format(floor_id))
+        floor_lvl_offset = floor.get_Parameter(Bip.FLOOR_HEIGHTABOVELEVEL_PARAM).AsDouble()
+        key = "{}_{}".format(floor_lvl_id, floor_lvl_offset)
+        floors_by_lvl_offset[key].append({
+            "floor": floor,
+            "id": floor_id,
+            "bbox": bbox_cache.get(floor),
+        })
+
+    with db.Transaction("join floors"):
+        for k, lvl_floors_infos in floors_by_lvl_offset.items():
+            print("________\nfloor_infos: {}".format(k))
+            for info in lvl_floors_infos:
+                floor = info["floor"]
+                floor_id = info["id"]
+                other_floor_ids = [i["id"] for i in lvl_floors_infos if not i["id"] == floor_id]
+                other_lvl_floor_ids = List[ElementId](other_floor_ids)
+                bbox = info["bbox"]
+                floor_outline = Outline(bbox.Min, bbox.Max)
+                bbox_filter = BoundingBoxIntersectsFilter(floor_outline, 0.03)
+                cx_floors = Fec(doc, other_lvl_floor_ids).OfCategory(Bic.OST_Floors).WherePasses(bbox_filter).ToElements()
+                print("cx_floors: {}".format(cx_floors))
+                for cx_floor in cx_floors:
+                    already_joined = JoinGeometryUtils.AreElementsJoined(doc, floor, cx_floor)
+                    if not already_joined:
+                        print("joining: {} with {}".format(floor.Id, cx_floor.Id))
+                        JoinGeometryUtils.JoinGeometry(doc, floor, cx_floor)
+
+
+print(bbox_cache)
 
 print("{} run in: ".format(__file__))
 stopwatch.Stop()
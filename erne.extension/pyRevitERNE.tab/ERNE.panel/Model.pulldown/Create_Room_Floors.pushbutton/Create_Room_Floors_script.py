@@ -36,7 +36,7 @@ def create_doors_floors(room, floor_type):
     door_floors = []
     room_level = doc.GetElement(room.LevelId)
     room_guid = room.UniqueId
-    room_bbox = bbx.get(room)
+    room_bbox = bbox_cache.get(room)
     outline = Outline(room_bbox.Min, room_bbox.Max)
     cx_filter = BoundingBoxIntersectsFilter(outline)
     cx_filter.Tolerance = -0.1
@@ -53,9 +53,9 @@ def create_doors_floors(room, floor_type):
         if cx_door_id not in door_ids_by_room[room_id.IntegerValue]:
             continue
 
-        door_bbx = bbx.get(cx_door)
+        door_bbx = bbox_cache.get(cx_door)
         wall = cx_door.Host
-        wall_bbx = bbx.get(wall)
+        wall_bbx = bbox_cache.get(wall)
         combined_bbx = bbx.get_bbox_intersection(door_bbx, wall_bbx)
         z_min_pts = bbx.bbox_xy_zmin_points(combined_bbx)
         room_level_z_pts = [XYZ(pt.X, pt.Y, room_level.Elevation) for pt in z_min_pts]
@@ -141,17 +141,20 @@ else:
 
 STRUCTURAL = False
 geo_opt = Options()
+# rooms, doors and walls are not modified by this script, only floors are added,
+# so the cache needs no DocumentChanged invalidation
+bbox_cache = bbx.BBoxCache(doc)
 
 doors = Fec(doc).OfCategory(Bic.OST_Doors ).WhereElementIsNotElementType().ToElements()
 door_ids = List[ElementId]([door.Id for door in doors])
-door_bboxes_by_id = {door.Id.IntegerValue:bbx.get(door) for door in doors}
+door_bboxes_by_id = {door.Id.IntegerValue:bbox_cache.get(door) for door in doors}
 
 floors = Fec(doc).OfCategory(Bic.OST_Floors).WhereElementIsNotElementType().ToElements()
 #floors_by_room_guid = {fl.get_Parameter(param.bip_map["comments"]).AsString(): fl for fl in floors}
 floors_by_room_guid = defaultdict(list)
-for floor in floors:
+floors_room_guids = param.read_many(floors, [room_guid_param_name])[room_guid_param_name]
+for floor, floor_belongs_to_room_guid in zip(floors, floors_room_guids):
     # floor_belongs_to_room_guid = floor.get_Parameter(param.bip_map["comments"]).AsString()
-    floor_belongs_to_room_guid = param.get_val(floor, room_guid_param_name)
     if floor_belongs_to_room_guid:
         floors_by_room_guid[floor_belongs_to_room_guid].append(floor)
 
@@ -170,16 +173,18 @@ for door in doors:
     door_ids_by_room[door_room.Id.IntegerValue].append(door.Id.IntegerValue)
 
 
+room_values = param.read_many(floor_rooms, [exclude_param_name, room_target_floor_type_param_name])
+
 print("processing {} rooms.".format(len(floor_rooms)))
 
 with db.Transaction("create/update:room_floors,door_floors"):
-    for room in floor_rooms:
+    for room_idx, room in enumerate(floor_rooms):
         print(35 * "-")
         room_id = room.Id
         room_guid = room.UniqueId
         room_level = doc.GetElement(room.LevelId)
         room_boundaries = get_room_boundaries(room, doc)
-        room_excluded = param.get_val(room, exclude_param_name)
+        room_excluded = room_values[exclude_param_name][room_idx]
         if room_excluded:
             print("room {} skipped!!: excluded by parameter {}".format(room_id, exclude_param_name))
             continue
@@ -188,7 +193,7 @@ with db.Transaction("create/update:room_floors,door_floors"):
             continue
         longest_room_boundary = room_boundaries[max(room_boundaries.keys())]
         # target_floor_type_from_room = room.get_Parameter(param.bip_map["room_floor_finish"]).AsString()
-        target_floor_type_from_room = param.get_val(room, room_target_floor_type_param_name)
+        target_floor_type_from_room = room_values[room_target_floor_type_param_name][room_idx]
 
         target_floor_type = floor_types[0]
         # print(room_guid, floors_by_room_guid.get(room_guid))
@@ -245,6 +250,7 @@ with db.Transaction("add_floor_openings"):
                 add_opening(floor, curve_array)
 
 print("\n{} updated {} floor rooms in: ".format(__file__, len(floor_rooms)))
+print(bbox_cache)
 
 stopwatch.Stop()
 print(stopwatch.Elapsed)
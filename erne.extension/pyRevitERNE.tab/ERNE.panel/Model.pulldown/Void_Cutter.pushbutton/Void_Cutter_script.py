@@ -17,9 +17,9 @@ import clr
 clr.AddReference("RevitAPI")
 from Autodesk.Revit.DB import FilteredElementCollector as Fec
 from Autodesk.Revit.DB import FilteredWorksetCollector as Fwc
-from Autodesk.Revit.DB import Outline, BoundingBoxIntersectsFilter, ElementIntersectsSolidFilter
+from Autodesk.Revit.DB import ElementIntersectsSolidFilter
 from Autodesk.Revit.DB import XYZ, ElementId, Element
-from Autodesk.Revit.DB import InstanceVoidCutUtils, Structure, Options, SolidOptions, BoundingBoxXYZ
+from Autodesk.Revit.DB import InstanceVoidCutUtils, Structure, Options, SolidOptions
 from Autodesk.Revit.DB import ModelPathUtils, RevitLinkInstance, RevitLinkOptions, RevitLinkType, WorksetKind
 from Autodesk.Revit.DB import Line, Curve, CurveLoop, GeometryCreationUtilities, ElementTransformUtils
 from collections import defaultdict, namedtuple, deque
@@ -31,7 +31,7 @@ import os.path as op
 from System.Diagnostics import Stopwatch
 from System.Collections.Generic import List
 from rpw import doc, uidoc, db
-from rph import param, bbx, debug
+from rph import param, bbx, debug, spatial
 from pyrevit import script
 
 
@@ -277,11 +277,8 @@ def get_bbox_of_solid_vertices(fam_inst):
         XYZ.BasisZ.ToString(), (XYZ.BasisZ * -1).ToString(),
     )
 
-    pts = {
-        "xmin": None, "xmax": None,
-        "ymin": None, "ymax": None,
-        "zmin": None, "zmax": None,
-    }
+    accumulator = bbx.BoxAccumulator()
+    vertices = []
 
     for geo_elem in inst_geo:
         for solid in geo_elem.GetInstanceGeometry():
@@ -295,48 +292,17 @@ def get_bbox_of_solid_vertices(fam_inst):
                     edges = solid.Edges
                     for edge in edges:
                         ep = edge.AsCurve().GetEndPoint(0)
-                        # first populate coords in dict
-                        if not pts["xmin"]:
-                            pts["xmin"] = ep.X
-
-                        if not pts["xmax"]:
-                            pts["xmax"] = ep.X
-
-                        if not pts["ymin"]:
-                            pts["ymin"] = ep.Y
-
-                        if not pts["ymax"]:
-                            pts["ymax"] = ep.Y
-
-                        if not pts["zmin"]:
-                            pts["zmin"] = ep.Z
-
-                        if not pts["zmax"]:
-                            pts["zmax"] = ep.Z
-
-                        # then keep updating
-                        if ep.X < pts["xmin"]:
-                            pts["xmin"] = ep.X
-                        elif ep.X > pts["xmax"]:
-                            pts["xmax"] = ep.X
-
-                        if ep.Y < pts["ymin"]:
-                            pts["ymin"] = ep.Y
-                        elif ep.Y > pts["ymax"]:
-                            pts["ymax"] = ep.Y
-
-                        if ep.Z < pts["zmin"]:
-                            pts["zmin"] = ep.Z
-                        elif ep.Z > pts["zmax"]:
-                            pts["zmax"] = ep.Z
+                        accumulator.add(ep)
+                        vertices.append((ep.X, ep.Y, ep.Z))
                     if not ortho:
                         debug.dprint(" non-ortho!! ")
                     break
 
-    vertex_bbox = BoundingBoxXYZ()
-    vertex_bbox.Max = XYZ(pts["xmax"], pts["ymax"], pts["zmax"])
-    vertex_bbox.Min = XYZ(pts["xmin"], pts["ymin"], pts["zmin"])
-    return vertex_bbox, ortho
+    vertex_bbox = accumulator.to_bbox()
+    vertex_obb = None
+    if not ortho:
+        vertex_obb = bbx.get_oriented_bbox(vertices)
+    return vertex_bbox, ortho, vertex_obb
 
 
 def mm_coord(coordinate):
@@ -441,11 +407,20 @@ def cut_solid_cx_elems(solid_cx_elems, cat, void, schlitz, cut_types):
     return void_cuts, void_cuts_types
 
 
-def get_solid_intersecting_elems(cut_categories, filtered_elem_ids, bbox_filter):
+def get_bbox_cx_elems(cat, void_bbox, void_obb=None):
+    cat_index = cut_elem_indexes[cat]
+    cx_ids = cat_index.overlapping(void_bbox, tolerance=bbox_tolerance)
+    if void_obb:
+        # rotated void: drop hosts only touched by the axis aligned bbox corners
+        cx_ids = [cx_id for cx_id in cx_ids if void_obb.overlaps_bbox(cat_index.bbox(cx_id), bbox_tolerance)]
+    return [doc.GetElement(ElementId(cx_id)) for cx_id in cx_ids]
+
+
+def get_solid_intersecting_elems(cut_categories, filtered_elem_ids, void_bbox, void_obb=None):
     solid_cut_elems = {}
     for cat in cut_categories:
         if filtered_elem_ids[cat]:
-            cx_elems = Fec(doc, filtered_elem_ids[cat]).WherePasses(bbox_filter).ToElements()
+            cx_elems = get_bbox_cx_elems(cat, void_bbox, void_obb)
             solid_cut_elems[cat] = verify_geometric_intersections(void_solid, [], cx_elems) or []
             debug.dprint(cat, [elem.Id.IntegerValue for elem in cx_elems])
         else:
@@ -525,6 +500,7 @@ ignored_durchbruch_ids = [
     # "S037U01",  # UG1
 ]
 ft_mm = 304.8
+bbox_tolerance = -0.03
 up = XYZ(0, 0, 1)
 non_struct = Structure.StructuralType.NonStructural
 geo_opt = Options()
@@ -565,7 +541,8 @@ void_types         = db.Collector(of_category="GenericModel",      is_type=True,
 
 counter = defaultdict(int)
 aussparung_types_dict = defaultdict(dict)
-local_void_by_bbx = {}
+local_void_bbx_strs = {}
+fuzzy_matched_voids = []
 void_not_cut_ids = []
 void_symbol = None
 
@@ -655,6 +632,8 @@ prerequisite_check()
 if not correct_selection(selection):
     sys.exit()
 
+param_writer = param.ParamWriter()
+
 with db.Transaction("cut_nested_rvt_voids"):
 
     selected_link_type = selection[0]
@@ -682,16 +661,18 @@ with db.Transaction("cut_nested_rvt_voids"):
 
     existing_gen_mods = get_local_gen_mods_for_link(family_filter_name, rvt_file_name)
 
-    bbx_ft_cache_existing = set()
-    bbx_ft_cache_remote   = set()
+    # voids are matched within 1mm instead of by exact bbox string,
+    # so float drift in the link does not make every void look new
+    bbx_cache_existing = bbx.BoxKeyIndex(grid=1 / ft_mm, tolerance=1 / ft_mm)
+    matched_existing_ids = set()
 
     print("creating local voids cache...")
     for gen_mod in existing_gen_mods:
         existing_bbx_str = gen_mod.LookupParameter("Creating_bbox").AsString()
         bbx_tuple = get_tuple_from_bbx_str(existing_bbx_str)
-        bbx_ft_cache_existing.add(existing_bbx_str)
+        bbx_cache_existing.add(bbx_tuple, gen_mod)
         debug.dprint("added ", existing_bbx_str)
-        local_void_by_bbx[existing_bbx_str] = gen_mod
+        local_void_bbx_strs[gen_mod.Id.IntegerValue] = existing_bbx_str
         void_height_map[gen_mod.Id.IntegerValue] = bbx_tuple[-1] - bbx_tuple[-4]
 
     print("creating remote voids cache...")
@@ -699,19 +680,22 @@ with db.Transaction("cut_nested_rvt_voids"):
         fam_name = gen_mod.Symbol.FamilyName
         if not re.match(discipline_void_re_pat, fam_name):
             continue
-        void_bbox, void_ortho = get_bbox_of_solid_vertices(gen_mod)
+        void_bbox, void_ortho, void_obb = get_bbox_of_solid_vertices(gen_mod)
         if void_bbox:
             debug.dprint("remote cache id:", gen_mod.Id.IntegerValue)
-            void_bbx_map[gen_mod.Id.IntegerValue] = {"bbox": void_bbox, "ortho": void_ortho}
-            remote_ft_bbx = bbx_ft_tuple_str(void_bbox)
-            bbx_ft_cache_remote.add(remote_ft_bbx)
+            void_bbx_map[gen_mod.Id.IntegerValue] = {"bbox": void_bbox, "ortho": void_ortho, "obb": void_obb}
+            for match in bbx_cache_existing.find_all(void_bbox):
+                matched_existing_ids.add(match.item.Id.IntegerValue)
 
-    obsolete_coords = bbx_ft_cache_existing - bbx_ft_cache_remote
+    obsolete_coords = []
     obsolete_ids = set()
-    for coord in obsolete_coords:
+    for obsolete_void in existing_gen_mods:
+        if obsolete_void.Id.IntegerValue in matched_existing_ids:
+            continue
+        coord = local_void_bbx_strs[obsolete_void.Id.IntegerValue]
+        obsolete_coords.append(coord)
         counter["voids_existing_obsolete"] += 1
         debug.dprint(coord)
-        obsolete_void = local_void_by_bbx[coord]
         obsolete_ids.add(obsolete_void.Id)
         obsolete_void.LookupParameter("Comments").Set("void_obsolete: {}".format(time_stamp))
         uncut_elems_cut_by_void(obsolete_void)
@@ -723,6 +707,11 @@ with db.Transaction("cut_nested_rvt_voids"):
         "roofs":              get_filtered_element_instances(local_roofs, filtered_roof_names),
         "structural_framing": get_filtered_element_instances(local_str_framings, filtered_str_framing_names),
     }
+    # one bbox index per category instead of a BoundingBoxIntersectsFilter query per void
+    cut_elem_indexes = {
+        cat: spatial.SpatialIndex.from_elements(doc.GetElement(elem_id) for elem_id in filtered_elem_ids[cat] or [])
+        for cat in cut_categories
+    }
 
     prog_bar_last_step = int(0.1 * linked_gen_mods.Count)
     prog_bar_total = linked_gen_mods.Count + prog_bar_last_step
@@ -766,12 +755,15 @@ with db.Transaction("cut_nested_rvt_voids"):
         if is_schlitz:
             print("is_schlitz: {}".format(is_schlitz), discipline)
 
-        void_bbox  = void_bbx_map[gen_mod.Id.IntegerValue]["bbox"]
-        void_ortho = void_bbx_map[gen_mod.Id.IntegerValue]["ortho"]
-        debug.dprint("found bbox: {} - {}".format(void_bbox.Min, void_bbox.Max))
+        void_info  = void_bbx_map.get(gen_mod.Id.IntegerValue, {})
+        void_bbox  = void_info.get("bbox")
+        void_ortho = void_info.get("ortho")
+        void_obb   = void_info.get("obb")
 
         if not void_bbox:
             print("bbox not found!!")
+        else:
+            debug.dprint("found bbox: {} - {}".format(void_bbox.Min, void_bbox.Max))
 
         if void_bbox:
             gen_void = None
@@ -790,22 +782,25 @@ with db.Transaction("cut_nested_rvt_voids"):
 
             remote_ft_bbx = bbx_ft_tuple_str(void_bbox)
             debug.dprint("ask existing cache if bbx exists:", remote_ft_bbx)
-            bbox_exists = remote_ft_bbx in bbx_ft_cache_existing
-            bbx_ft_cache_remote.add(remote_ft_bbx)
+            existing_match = bbx_cache_existing.find(void_bbox)
+            bbox_exists = existing_match is not None
+            # the stored bbox string is rounded, only a changed string is a fuzzy match
+            existing_bbx_str = local_void_bbx_strs.get(existing_match.item.Id.IntegerValue) if bbox_exists else None
+            if bbox_exists and existing_bbx_str != remote_ft_bbx:
+                counter["voids_existing_fuzzy_matched"] += 1
+                fuzzy_matched_voids.append((existing_match.item.Id, existing_match.deviation))
 
             void_cuts = {category: False for category in cut_categories}
             void_cut_type = ""
 
-            void_outline = Outline(void_bbox.Min, void_bbox.Max)
             void_solid   = get_solid_extrusion_from_bbox(void_bbox)
-            bbox_filter  = BoundingBoxIntersectsFilter(void_outline, -0.03)
 
             if bbox_exists:
                 debug.dprint("bbox exist already: {}".format(bbox_exists))
                 counter["voids_existing_already"] += 1
-                local_existing_void = local_void_by_bbx[remote_ft_bbx]
+                local_existing_void = existing_match.item
                 local_existing_void_id = local_existing_void.Id.IntegerValue
-                param.set_val(local_existing_void, "Durchbruch Nummer", durchbruch_nr)
+                param_writer.queue(local_existing_void, "Durchbruch Nummer", durchbruch_nr)
                 print("bbox exist already, updating void data, checking for recut.")
 
                 already_cutting_ids = {eid.IntegerValue for eid in InstanceVoidCutUtils.GetElementsBeingCut(local_existing_void)}
@@ -816,7 +811,7 @@ with db.Transaction("cut_nested_rvt_voids"):
 
                 for cat in cx_cut_elems:
                     if filtered_elem_ids[cat]:
-                        cx_elems = Fec(doc, filtered_elem_ids[cat]).WherePasses(bbox_filter).ToElements()
+                        cx_elems = get_bbox_cx_elems(cat, void_bbox, void_obb)
                         cx_cut_elems[cat] = verify_geometric_intersections(void_solid, already_cutting_ids,
                                                                            cx_elems) or []
 
@@ -897,7 +892,7 @@ with db.Transaction("cut_nested_rvt_voids"):
                 counter["voids_new_created"] += 1
                 if not void_ortho:
                     found_rotation = gen_mod.Location.Rotation
-                    print("void is not ortho, angle: {}".format(found_rotation))
+                    print("void is not ortho, angle: {}, oriented bbox: {}".format(found_rotation, void_obb))
 
                 if not void_ortho:
                     loc_pt = bbx.bbox_centroid(void_bbox)
@@ -915,7 +910,7 @@ with db.Transaction("cut_nested_rvt_voids"):
                 print("recutting: {}".format(recut_existing.Id.IntegerValue))
 
             if gen_void:
-                cx_cut_elems = get_solid_intersecting_elems(cut_categories, filtered_elem_ids, bbox_filter)
+                cx_cut_elems = get_solid_intersecting_elems(cut_categories, filtered_elem_ids, void_bbox, void_obb)
                 for cat in cx_cut_elems:
                     void_cut_cat, void_cut_type_found = cut_solid_cx_elems(
                         cx_cut_elems[cat],
@@ -1001,6 +996,7 @@ with db.Transaction("cut_nested_rvt_voids"):
         else:
             expand_void_antenna(gen_mod, void_height, lvl_cat.OKRB_elevations)
 
+    param_writer.apply()
     doc.Delete(link_inst.Id)
     doc.Delete(rvt_link_type.ElementId)
     output.update_progress(prog_bar_total, prog_bar_total)
@@ -1015,9 +1011,16 @@ print("ids of {} obsolete voids:".format(counter["voids_existing_obsolete"]))
 for void_id in obsolete_ids:
     print(output.linkify(void_id))
 print(70 * "-")
+print("{} voids matched existing voids within tolerance:".format(counter["voids_existing_fuzzy_matched"]))
+for void_id, deviation in fuzzy_matched_voids:
+    print("{} max deviation: {:.6f}mm".format(output.linkify(void_id), deviation * ft_mm))
+print(70 * "-")
 print("new voids that did not cut anything:")
 print([output.linkify(elem_id) for elem_id in void_not_cut_ids])
 
+print(70 * "-")
+param_writer.print_report()
+
 print(70 * "-")
 for topic in sorted(counter):
     print("{} : {}".format(str(counter[topic]).zfill(4), topic))
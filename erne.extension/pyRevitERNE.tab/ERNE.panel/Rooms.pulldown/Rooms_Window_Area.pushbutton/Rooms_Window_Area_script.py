@@ -9,7 +9,7 @@ from Autodesk.Revit.DB import FilteredElementCollector as Fec
 from Autodesk.Revit.DB import ElementId
 from System.Diagnostics import Stopwatch
 from collections import defaultdict
-from rpw import doc, db
+from rpw import doc
 from rph import param
 
 
@@ -45,10 +45,12 @@ for phase in doc.Phases:
     last_phase = phase
 print("using phase: {}".format(last_phase.Name))
 
-for window in windows:
+windows_excluded = param.read_many(windows, [exclude_param_name])[exclude_param_name]
+
+for window, window_excluded in zip(windows, windows_excluded):
     window_id = window.Id
     print("________\nwindow_id: {}".format(window_id))
-    if param.get_val(window, exclude_param_name):
+    if window_excluded:
         print("skipping window excluded by parameter")
         continue
 
@@ -58,16 +60,20 @@ for window in windows:
         window_area = get_window_area(window)
         window_area_by_room[window_room.Id.IntegerValue] += window_area
 
-with db.Transaction("window area per room"):
-    for room_id, area in window_area_by_room.items():
-        room = doc.GetElement(ElementId(room_id))
-        room_name = param.get_val(room, "Name")
-        room_area = room.Area
-        print("________\nroom: {} - {}".format(room_id, room_name))
-        print(room, area * SQFT_SQMT)
-        param.set_val(room, room_rvt_id_param_name, str(room_id))
-        param.set_val(room, window_area_param_name, area)
-        param.set_val(room, area_ratio_param_name, area / room_area)
+param_writer = param.ParamWriter()
+
+for room_id, area in window_area_by_room.items():
+    room = doc.GetElement(ElementId(room_id))
+    room_name = param.get_val(room, "Name")
+    room_area = room.Area
+    print("________\nroom: {} - {}".format(room_id, room_name))
+    print(room, area * SQFT_SQMT)
+    param_writer.queue(room, room_rvt_id_param_name, str(room_id))
+    param_writer.queue(room, window_area_param_name, area)
+    param_writer.queue(room, area_ratio_param_name, area / room_area)
+
+param_writer.apply("window area per room")
+param_writer.print_report()
 
 print("{} updated in: ".format(__file__))
 stopwatch.Stop()
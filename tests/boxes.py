@@ -0,0 +1,43 @@
+"""
+Random boxes and brute force references shared by the box engine tests.
+Boxes are six float tuples: min_x, min_y, min_z, max_x, max_y, max_z.
+"""
+import random
+
+TOLERANCES = (0.0, 0.5, -0.5, -1.5)
+
+
+def random_boxes(count, seed, extent=40, size=6):
+    # integer coordinates, so boxes often touch exactly
+    rnd = random.Random(seed)
+    boxes = []
+    for _ in range(count):
+        x, y, z = rnd.randint(0, extent), rnd.randint(0, extent), rnd.randint(0, extent // 4)
+        boxes.append((
+            float(x), float(y), float(z),
+            float(x + rnd.randint(1, size)), float(y + rnd.randint(1, size)), float(z + rnd.randint(1, size)),
+        ))
+    return boxes
+
+
+def brute_overlapping(boxes, query, tolerance):
+    return [
+        idx for idx, box in enumerate(boxes)
+        if all(box[axis] <= query[axis + 3] + tolerance and box[axis + 3] >= query[axis] - tolerance
+               for axis in range(3))
+    ]
+
+
+def brute_contained(boxes, query, tolerance):
+    return [
+        idx for idx, box in enumerate(boxes)
+        if all(box[axis] >= query[axis] - tolerance and box[axis + 3] <= query[axis + 3] + tolerance
+               for axis in range(3))
+    ]
+
+
+def strictly_overlap(box_a, box_b, tolerance=0.0):
+    return all(
+        box_a[axis + 3] + tolerance > box_b[axis] and box_a[axis] < box_b[axis + 3] + tolerance
+        for axis in range(3)
+    )
@@ -0,0 +1,312 @@
+"""
+Checks the rph.bbx box engines against brute force
+on random six float tuples, runs on plain CPython without Revit:
+
+    python -m pytest tests
+"""
+import math
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "RevitPythonHelper.lib"))
+
+from rph import bbx
+
+from boxes import TOLERANCES, brute_overlapping, random_boxes, strictly_overlap
+
+USE_NUMPY = [False, pytest.param(True, marks=pytest.mark.skipif(bbx.np is None, reason="numpy not installed"))]
+
+
+@pytest.mark.parametrize("use_numpy", USE_NUMPY)
+def test_box_array_matches_per_box_results(use_numpy):
+    boxes = random_boxes(60, seed=20)
+    query = (10.0, 10.0, 2.0, 25.0, 22.0, 8.0)
+    box_array = bbx.BoxArray.from_bboxes(boxes, use_numpy=use_numpy)
+    assert box_array.use_numpy == use_numpy
+    assert len(box_array) == len(boxes)
+    assert list(box_array) == boxes
+    assert box_array.union() == tuple(
+        [min(box[axis] for box in boxes) for axis in range(3)] +
+        [max(box[axis] for box in boxes) for axis in range(3, 6)]
+    )
+    assert [bool(flag) for flag in box_array.overlaps(query)] == [strictly_overlap(box, query) for box in boxes]
+    inter = box_array.intersection(query)
+    for idx, box in enumerate(boxes):
+        assert inter[idx] == tuple([max(box[axis], query[axis]) for axis in range(3)] +
+                                   [min(box[axis], query[axis]) for axis in range(3, 6)])
+    offset = box_array.offset(0.5)
+    assert offset[3] == tuple([coord - 0.5 for coord in boxes[3][:3]] + [coord + 0.5 for coord in boxes[3][3:]])
+    xs, ys, zs = box_array.centroids()
+    assert (xs[7], ys[7], zs[7]) == tuple((boxes[7][axis] + boxes[7][axis + 3]) / 2.0 for axis in range(3))
+    assert list(box_array.take([5, 0, 5])) == [boxes[5], boxes[0], boxes[5]]
+
+
+@pytest.mark.parametrize("use_numpy", USE_NUMPY)
+def test_box_array_element_wise_and_empty(use_numpy):
+    boxes_a = random_boxes(40, seed=21)
+    boxes_b = random_boxes(40, seed=22)
+    array_a = bbx.BoxArray.from_bboxes(boxes_a, use_numpy=use_numpy)
+    array_b = bbx.BoxArray.from_bboxes(boxes_b, use_numpy=use_numpy)
+    assert [bool(flag) for flag in array_a.overlaps(array_b)] == [
+        strictly_overlap(box_a, box_b) for box_a, box_b in zip(boxes_a, boxes_b)
+    ]
+    with pytest.raises(ValueError):
+        array_a.overlaps(array_b.take(range(3)))
+    assert bbx.BoxArray(use_numpy=use_numpy).union() is None
+
+
+def test_overlapping_pairs_matches_brute_force():
+    boxes = random_boxes(150, seed=9)
+    for tolerance in TOLERANCES:
+        expected = [
+            (idx_a, idx_b)
+            for idx_a in range(len(boxes))
+            for idx_b in range(idx_a + 1, len(boxes))
+            if strictly_overlap(boxes[idx_a], boxes[idx_b], tolerance)
+        ]
+        assert bbx.overlapping_pairs(boxes, tolerance=tolerance) == expected
+
+
+def test_overlapping_pairs_other_matches_brute_force():
+    boxes = random_boxes(80, seed=10)
+    other = random_boxes(60, seed=11)
+    for tolerance in TOLERANCES:
+        expected = [
+            (idx_a, idx_b)
+            for idx_a in range(len(boxes))
+            for idx_b in range(len(other))
+            if strictly_overlap(boxes[idx_a], other[idx_b], tolerance)
+        ]
+        assert bbx.overlapping_pairs(boxes, tolerance=tolerance, other=other) == expected
+
+
+def test_box_key_index_matches_brute_force():
+    rnd = random.Random(12)
+    boxes = [tuple(coord + rnd.uniform(-0.4, 0.4) for coord in box) for box in random_boxes(200, seed=13)]
+    index = bbx.BoxKeyIndex(grid=1.0, tolerance=0.5)
+    for idx, box in enumerate(boxes):
+        index.add(box, idx)
+    assert len(index) == len(boxes)
+    for query in random_boxes(200, seed=13):
+        expected = sorted(
+            idx for idx, box in enumerate(boxes)
+            if max(abs(a - b) for a, b in zip(query, box)) <= 0.5
+        )
+        matches = index.find_all(query)
+        assert sorted(match.item for match in matches) == expected
+        assert [match.deviation for match in matches] == sorted(match.deviation for match in matches)
+
+
+def test_box_key_index_find_closest():
+    index = bbx.BoxKeyIndex(grid=1.0, tolerance=0.25)
+    index.add((0.0, 0.0, 0.0, 1.0, 1.0, 1.0), "a")
+    index.add((0.1, 0.0, 0.0, 1.1, 1.0, 1.0), "b")
+    assert index.find((0.09, 0.0, 0.0, 1.09, 1.0, 1.0)).item == "b"
+    assert index.find((0.02, 0.0, 0.0, 1.0, 1.0, 1.0)).item == "a"
+    assert index.find((0.5, 0.0, 0.0, 1.5, 1.0, 1.0)) is None
+
+
+def test_oriented_box_overlaps_bbox_axis_aligned():
+    boxes = random_boxes(100, seed=14)
+    oriented = bbx.OrientedBox(20.0, 20.0, 1.0, 0.0, 5.0, 3.0, 2.0, 8.0)
+    aabb = oriented.aabb_coords()
+    for box in boxes:
+        for tolerance in TOLERANCES:
+            assert oriented.overlaps_bbox(box, tolerance) == bool(brute_overlapping([box], aabb, tolerance))
+
+
+def test_oriented_bbox_of_rotated_points():
+    # 4 x 2 rectangle rotated by 30 degrees around (10, 5), z from 1 to 3
+    angle = math.radians(30)
+    dir_x, dir_y = math.cos(angle), math.sin(angle)
+    points = []
+    for u, v, z in [(u, v, z) for u in (-2, 2) for v in (-1, 1) for z in (1.0, 3.0)]:
+        points.append((10 + u * dir_x - v * dir_y, 5 + u * dir_y + v * dir_x, z))
+    oriented = bbx.get_oriented_bbox(points)
+    assert sorted([oriented.half_u, oriented.half_v]) == pytest.approx([1.0, 2.0])
+    assert (oriented.center_x, oriented.center_y) == pytest.approx((10.0, 5.0))
+    assert (oriented.min_z, oriented.max_z) == (1.0, 3.0)
+    aabb = oriented.aabb_coords()
+    corner = (aabb[0] - 0.1, aabb[1] - 0.1, 1.0, aabb[0] + 0.3, aabb[1] + 0.3, 2.0)
+    assert brute_overlapping([corner], aabb, 0.0)
+    assert not oriented.overlaps_bbox(corner)
+    assert oriented.overlaps_bbox((9.5, 4.5, 0.0, 10.5, 5.5, 1.0))
+    assert bbx.get_oriented_bbox([]) is None
+
+
+def test_aabb_matches_bbox_helpers():
+    boxes = [bbx.AABB.from_bbox(box) for box in random_boxes(60, seed=23)]
+    for box_a in boxes[:20]:
+        for box_b in boxes:
+            assert box_a.overlaps(box_b) == bbx.bboxes_overlap(box_a, box_b) == strictly_overlap(box_a.coords(), box_b.coords())
+            inter = box_a.intersection(box_b)
+            if box_a.overlaps(box_b):
+                assert inter.coords() == bbx.BoxArray.from_bboxes([box_a]).intersection(box_b)[0]
+            else:
+                assert inter is None
+        for vector in "xyz":
+            assert box_a.edge_length(vector) == bbx.bbox_edge_length(box_a, vector)
+        assert box_a.long_edge_is_x_vector() == bbx.bbox_long_edge_is_x_vector(box_a)
+        assert box_a.long_edge_is_y_vector() == bbx.bbox_long_edge_is_y_vector(box_a)
+        assert box_a.min_max_str() == bbx.bbx_min_max_str(box_a)
+    assert boxes[0].union(*boxes[1:]).coords() == bbx.BoxArray.from_bboxes(boxes).union()
+    assert boxes[0].offset(1.0).coords() == bbx.BoxArray.from_bboxes(boxes[:1]).offset(1.0)[0]
+
+
+def test_aabb_value_semantics():
+    box = bbx.AABB(0.0, 1.0, 2.0, 4.0, 5.0, 6.0)
+    assert bbx.AABB.from_bbox(box.coords()) == box
+    assert box != bbx.AABB(0.0, 1.0, 2.0, 4.0, 5.0, 7.0)
+    assert len({box, bbx.AABB(*box)}) == 1
+    assert bbx.bbox_coords(box) == (0.0, 1.0, 2.0, 4.0, 5.0, 6.0)
+    assert box.centroid() == (2.0, 3.0, 4.0)
+    assert (box.Min.X, box.Max.Z) == (0.0, 6.0)
+    assert [point.Z for point in box.xy_zmin_points()] == [2.0] * 4
+
+
+def test_box_accumulator_matches_min_max():
+    rnd = random.Random(24)
+    points = [(rnd.uniform(-5, 5), rnd.uniform(-5, 5), rnd.choice([0.0, rnd.uniform(-1, 1)])) for _ in range(200)]
+    expected = tuple([min(pt[axis] for pt in points) for axis in range(3)] +
+                     [max(pt[axis] for pt in points) for axis in range(3)])
+    accumulator = bbx.BoxAccumulator()
+    accumulator.add_many(pt for pt in points)
+    assert accumulator.coords() == expected
+    assert accumulator.count == len(points)
+    chunked = bbx.BoxAccumulator()
+    for start in range(0, len(points), 64):
+        chunk = points[start:start + 64]
+        chunked.add_chunk(*[[pt[axis] for pt in chunk] for axis in range(3)])
+    assert chunked.coords() == expected
+    assert bbx.AABB.from_points(iter(points)).coords() == expected
+    if bbx.np is not None:
+        columns = bbx.np.array(points).T
+        numpy_chunked = bbx.BoxAccumulator()
+        numpy_chunked.add_chunk(columns[0], columns[1], columns[2])
+        assert numpy_chunked.coords() == expected
+
+
+def test_box_accumulator_points_and_empty():
+    accumulator = bbx.BoxAccumulator()
+    assert accumulator.coords() is None
+    assert accumulator.to_aabb() is None
+    assert bbx.AABB.from_points([]) is None
+    accumulator.add(bbx.Point(0.0, -1.0, 2.0))
+    accumulator.add((3.0, 0.0, 0.0))
+    assert accumulator.to_aabb() == bbx.AABB(0.0, -1.0, 0.0, 3.0, 0.0, 2.0)
+
+
+def brute_metrics(box_a, box_b):
+    inter = 1.0
+    for axis in range(3):
+        inter *= max(min(box_a[axis + 3], box_b[axis + 3]) - max(box_a[axis], box_b[axis]), 0.0)
+    vol_a = (box_a[3] - box_a[0]) * (box_a[4] - box_a[1]) * (box_a[5] - box_a[2])
+    vol_b = (box_b[3] - box_b[0]) * (box_b[4] - box_b[1]) * (box_b[5] - box_b[2])
+    return inter, inter / (vol_a + vol_b - inter)
+
+
+@pytest.mark.parametrize("use_numpy", USE_NUMPY)
+def test_overlap_metrics_match_brute_force(use_numpy):
+    boxes = random_boxes(80, seed=25)
+    other = random_boxes(40, seed=26)
+    pairs = [(idx_a, idx_b) for idx_a in range(len(boxes)) for idx_b in range(len(other))]
+    volumes, ratios = bbx.overlap_metrics(bbx.BoxArray.from_bboxes(boxes, use_numpy=use_numpy), pairs, other)
+    for (idx_a, idx_b), volume, ratio in zip(pairs, volumes, ratios):
+        assert (volume, ratio) == pytest.approx(brute_metrics(boxes[idx_a], other[idx_b]))
+    expected = {}
+    for idx_a, idx_b in pairs:
+        ratio = brute_metrics(boxes[idx_a], other[idx_b])[1]
+        if ratio > 0.1:
+            expected.setdefault(idx_a, {})[idx_b] = pytest.approx(ratio)
+    assert expected
+    assert bbx.overlap_matrix(boxes, pairs, other, threshold=0.1) == expected
+
+
+def test_overlap_metrics_touching_and_empty():
+    boxes = [(0.0, 0.0, 0.0, 1.0, 1.0, 1.0), (1.0, 0.0, 0.0, 2.0, 1.0, 1.0), (0.5, 0.0, 0.0, 1.5, 1.0, 1.0)]
+    volumes, ratios = bbx.overlap_metrics(boxes, [(0, 1), (0, 2)])
+    assert list(volumes) == [0.0, 0.5]
+    assert list(ratios) == pytest.approx([0.0, 0.5 / 1.5])
+    volumes, ratios = bbx.overlap_metrics(boxes, [])
+    assert (len(volumes), len(ratios)) == (0, 0)
+
+
+class StubId(object):
+    def __init__(self, value):
+        self.IntegerValue = value
+
+
+class StubElement(object):
+    def __init__(self, value, box):
+        self.Id = StubId(value)
+        self.box = box
+        self.queries = 0
+
+    def get_BoundingBox(self, view):
+        self.queries += 1
+        return self.box
+
+
+class StubEvent(object):
+    def __init__(self):
+        self.handlers = []
+
+    def __iadd__(self, handler):
+        self.handlers.append(handler)
+        return self
+
+    def __isub__(self, handler):
+        self.handlers.remove(handler)
+        return self
+
+    def fire(self, args):
+        for handler in list(self.handlers):
+            handler(None, args)
+
+
+class StubDocument(object):
+    def __init__(self):
+        self.Application = type("StubApplication", (object,), {})()
+        self.Application.DocumentChanged = StubEvent()
+
+    def Equals(self, other):
+        return other is self
+
+
+class StubChange(object):
+    def __init__(self, doc, modified=(), deleted=()):
+        self.doc = doc
+        self.modified = [StubId(value) for value in modified]
+        self.deleted = [StubId(value) for value in deleted]
+
+    def GetDocument(self):
+        return self.doc
+
+    def GetModifiedElementIds(self):
+        return self.modified
+
+    def GetDeletedElementIds(self):
+        return self.deleted
+
+
+def test_bbox_cache_queries_once_until_changed():
+    doc = StubDocument()
+    elements = [StubElement(value, bbx.AABB(value, 0.0, 0.0, value + 1.0, 1.0, 1.0)) for value in range(1, 4)]
+    event = doc.Application.DocumentChanged
+    with bbx.BBoxCache(doc) as cache:
+        assert len(event.handlers) == 1
+        for _ in range(3):
+            assert [cache.get(elem) for elem in elements] == [elem.box for elem in elements]
+        assert [elem.queries for elem in elements] == [1, 1, 1]
+        event.fire(StubChange(StubDocument(), modified=[1]))
+        event.fire(StubChange(doc, modified=[1], deleted=[3]))
+        assert len(cache) == 1
+        cache.invalidate([2])
+        for elem in elements:
+            cache.get(elem)
+        assert [elem.queries for elem in elements] == [2, 2, 2]
+        assert cache.stats() == {"size": 3, "hits": 6, "misses": 6, "invalidated": 3, "hit_ratio": 0.5}
+    assert event.handlers == []
@@ -0,0 +1,67 @@
+"""
+Round trips of rph.columnar files, runs on plain CPython without Revit:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "RevitPythonHelper.lib"))
+
+from rph import columnar
+
+HEADER = ["ElementId", "Workset", "Width", "Workset", "Edited by", "Edited by"]
+
+
+def make_rows(count):
+    return [
+        [str(idx), "WS_{}".format(idx % 3), repr(idx * 0.25), "Type_WS_{}".format(idx % 2), "alice", "bob_{}".format(idx % 5)]
+        for idx in range(count)
+    ]
+
+
+def write_file(tmp_path, header, rows, chunk_rows=4):
+    path = str(tmp_path / "dump.rphc")
+    with columnar.ColumnarWriter(path, header, chunk_rows=chunk_rows) as writer:
+        writer.write_rows(rows)
+    return path
+
+
+def test_duplicate_names_round_trip(tmp_path):
+    rows = make_rows(10)
+    path = write_file(tmp_path, HEADER, rows)
+    with columnar.ColumnarReader(path) as reader:
+        assert reader.columns == HEADER
+        assert reader.rows == len(rows)
+        assert reader.kinds == ["int", "dict", "float", "dict", "dict", "dict"]
+        columns = reader.read()
+        assert columns[0] == list(range(10))
+        assert columns[2] == [idx * 0.25 for idx in range(10)]
+        assert columns[1] == [row[1] for row in rows]
+        assert columns[3] == [row[3] for row in rows]
+        assert columns[4] == [row[4] for row in rows]
+        assert columns[5] == [row[5] for row in rows]
+        assert reader.column(-1) == columns[5]
+
+
+def test_names_resolve_only_when_unique(tmp_path):
+    path = write_file(tmp_path, HEADER, make_rows(5))
+    with columnar.ColumnarReader(path) as reader:
+        assert reader.index("Width") == 2
+        assert reader.read(["Width", 0]) == [reader.column(2), reader.column("ElementId")]
+        with pytest.raises(ValueError):
+            reader.column("Workset")
+        with pytest.raises(KeyError):
+            reader.column("Comments")
+        with pytest.raises(IndexError):
+            reader.column(len(HEADER))
+
+
+def test_mixed_kind_column_reads_original_strings(tmp_path):
+    values = ["1", "2", "3", "4", "0.5", "-", "7", "8"]
+    path = write_file(tmp_path, ["Mark"], [[value] for value in values])
+    with columnar.ColumnarReader(path) as reader:
+        assert reader.kinds == ["dict"]
+        assert reader.column("Mark") == values
@@ -0,0 +1,107 @@
+"""
+Checks the pure python parts of rph.param on the fake_revit
+stand-ins of the benchmarks, runs on plain CPython without Revit:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "RevitPythonHelper.lib"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import fake_revit
+
+DB = fake_revit.install()
+
+from rph import param
+
+
+def make_element():
+    return fake_revit.Element([
+        DB.Parameter("Comments", DB.StorageType.String, None),
+        DB.Parameter("Mark", DB.StorageType.String, "A1"),
+        DB.Parameter("Width", DB.StorageType.Double, 1.5),
+        DB.Parameter("Count", DB.StorageType.Integer, 3),
+        DB.Parameter("Level", DB.StorageType.ElementId, DB.ElementId(7)),
+        DB.Parameter("Area", DB.StorageType.Double, 2.0, read_only=True),
+    ])
+
+
+def test_is_equal_per_storage_type():
+    elem = make_element()
+    assert param.is_equal(param.get_param(elem, "Comments"), "")
+    assert not param.is_equal(param.get_param(elem, "Comments"), "x")
+    assert param.is_equal(param.get_param(elem, "Width"), 1.5 + 1e-12)
+    assert not param.is_equal(param.get_param(elem, "Width"), 1.5 + 1e-6)
+    assert param.is_equal(param.get_param(elem, "Width"), 1.5 + 1e-6, tolerance=1e-5)
+    assert not param.is_equal(param.get_param(elem, "Width"), "wide")
+    assert param.is_equal(param.get_param(elem, "Level"), DB.ElementId(7))
+    assert param.is_equal(param.get_param(elem, "Level"), 7)
+    assert not param.is_equal(param.get_param(elem, "Count"), 4)
+
+
+def test_param_writer_sets_only_changed_values():
+    elements = [make_element() for _ in range(3)]
+    writer = param.ParamWriter()
+    for idx, elem in enumerate(elements):
+        writer.queue(elem, "Mark", "A{}".format(idx))
+        writer.queue(elem, "Width", 1.5)
+        writer.queue(elem, "Area", 3.0)
+        writer.queue(elem, "Missing", 1)
+    assert len(writer) == 12
+    report = writer.apply("write marks")
+    assert len(writer) == 0
+    assert [param.get_val(elem, "Mark") for elem in elements] == ["A0", "A1", "A2"]
+    assert dict(report) == {
+        "Mark": {"changed": 2, "unchanged": 1, "failed": 0},
+        "Width": {"changed": 0, "unchanged": 3, "failed": 0},
+        "Area": {"changed": 0, "unchanged": 0, "failed": 3},
+        "Missing": {"changed": 0, "unchanged": 0, "failed": 3},
+    }
+    assert sorted(set(reason for elem_id, name, reason in writer.failures)) == ["not found", "read only"]
+
+
+def test_param_writer_reports_failed_sets():
+    elem = make_element()
+    mark = param.get_param(elem, "Mark")
+    mark.Set = lambda value: False
+    count = param.get_param(elem, "Count")
+
+    def raise_on_set(value):
+        raise ValueError("out of range")
+
+    count.Set = raise_on_set
+    writer = param.ParamWriter()
+    writer.queue(elem, "Mark", "B")
+    writer.queue(elem, "Count", -1)
+    report = writer.apply()
+    assert report["Mark"]["failed"] == report["Count"]["failed"] == 1
+    assert [reason for elem_id, name, reason in writer.failures] == ["Set returned False", "out of range"]
+
+
+@pytest.mark.parametrize("raw, factor, decimals, expected", [
+    (0.125, 1.0, 2, "0.13"),
+    (2.675, 1.0, 2, "2.68"),
+    (2.5, 1.0, 0, "3"),
+    (-2.5, 1.0, 0, "-3"),
+    (-0.001, 1.0, 2, "0.00"),
+    (1e-7, 1.0, 3, "0.000"),
+    (1.0, 304.8, 0, "305"),
+    (0.5, 304.8, 1, "152.4"),
+    (123456.789, 1.0, 1, "123456.8"),
+])
+def test_format_number_rounds_half_up(raw, factor, decimals, expected):
+    assert param.format_number(raw, factor, decimals) == expected
+
+
+def test_format_number_decimal_comma():
+    assert param.format_number(0.5, 1.0, 2, decimal_comma=True) == "0,50"
+
+
+def test_accuracy_decimals_only_for_powers_of_ten():
+    assert [param.accuracy_decimals(accuracy) for accuracy in (1, 0.1, 0.01, 0.001)] == [0, 1, 2, 3]
+    assert [param.accuracy_decimals(accuracy) for accuracy in (0.5, 0.25, 2, 0)] == [None] * 4
@@ -0,0 +1,101 @@
+"""
+Round trips of the rph.sinks dump sinks, runs on plain CPython without Revit:
+
+    python -m pytest tests
+"""
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "RevitPythonHelper.lib"))
+
+from rph import sinks
+
+
+HEADER = ["rvt_id", "GUID", "location", "Comments"]
+
+
+def make_rows(start, stop, comment="c"):
+    return [(str(idx), "g{}".format(idx), "", "{}; {}\n\"{}\"".format(comment, idx, idx)) for idx in range(start, stop)]
+
+
+def test_csv_sink_round_trip(tmp_path):
+    path = str(tmp_path / "Walls.csv")
+    rows = make_rows(0, 25)
+    with sinks.CsvSink(path, HEADER, buffer_size=10) as sink:
+        sink.write_rows(rows[:12])
+        assert sink.rows == 10
+        sink.write_rows(rows[12:])
+    assert sink.rows == len(rows)
+    header, read_rows = sinks.read_csv(path)
+    assert header == HEADER
+    assert [tuple(row) for row in read_rows] == rows
+
+
+def test_csv_sink_resume_truncates_to_offset(tmp_path):
+    path = str(tmp_path / "Walls.csv")
+    rows = make_rows(0, 20)
+    with sinks.CsvSink(path, HEADER) as sink:
+        sink.write_rows(rows[:10])
+        sink.flush()
+        offset = sink.size()
+        # rows after the last checkpoint, written again on resume
+        sink.write_rows(rows[10:15])
+    with sinks.CsvSink(path, HEADER, resume_offset=offset) as sink:
+        sink.write_rows(rows[10:])
+    assert [tuple(row) for row in sinks.read_csv(path)[1]] == rows
+
+
+def test_unique_columns_ignores_case():
+    assert sinks.unique_columns(["GUID", "Mark", "mark", "MARK", "Mark_2", "Guid"]) == [
+        "GUID", "Mark", "mark_2", "MARK_3", "Mark_2_2", "Guid_2",
+    ]
+
+
+def test_sqlite_sink_case_duplicates_and_stale_rows():
+    connection = sqlite3.connect(":memory:")
+    header = ["rvt_id", "GUID", "location", "Comments", "comments", "Dump_Run"]
+    with sinks.SqliteSink(connection, "Walls", header, "GUID", buffer_size=2, run="run_1") as sink:
+        sink.write_rows([("1", "g1", "", "a", "b", "x"), ("2", "g2", "", "c", "d", "y"), ("3", "g3", "", "e", "f", "z")])
+    assert sink.columns == ["rvt_id", "GUID", "location", "Comments", "comments_2", "Dump_Run_2", sinks.RUN_COLUMN]
+    with sinks.SqliteSink(connection, "Walls", header + ["COMMENTS"], "GUID", run="run_2") as sink:
+        sink.write_rows([("2", "g2", "", "c2", "d2", "y", "h"), ("4", "g4", "", "g", "h", "w", "i")])
+    rows = connection.execute(
+        'SELECT rvt_id, GUID, Comments, comments_2, COMMENTS_3, Dump_Run_2, dump_run FROM Walls ORDER BY rvt_id'
+    ).fetchall()
+    assert rows == [(2, "g2", "c2", "d2", "h", "y", "run_2"), (4, "g4", "g", "h", "i", "w", "run_2")]
+
+
+def write_run(export_path, run, previous_manifest, cat_name, sink):
+    manifest_name = "{}_{}".format(run, sinks.DELTA_MANIFEST_SUFFIX)
+    sinks.write_json(os.path.join(export_path, manifest_name), {
+        "run": run, "previous": previous_manifest, "categories": {cat_name: sink.manifest_entry()},
+    })
+    sinks.write_json(os.path.join(export_path, sinks.DELTA_INDEX_NAME), {
+        "manifest": manifest_name, "categories": {cat_name: {"header": HEADER, "hashes": sink.hashes}},
+    })
+    return manifest_name
+
+
+def test_delta_sink_reconstructs_latest_run(tmp_path):
+    export_path = str(tmp_path)
+    first_rows = make_rows(0, 10)
+    with sinks.HashingCsvSink(os.path.join(export_path, "run1_Walls.csv"), HEADER) as sink:
+        sink.write_rows(first_rows)
+    first_manifest = write_run(export_path, "run1", None, "Walls", sink)
+
+    # 0-1 deleted, 2-4 modified, 5-9 unchanged, 10-11 added
+    second_rows = make_rows(2, 5, comment="changed") + first_rows[5:] + make_rows(10, 12)
+    index = sinks.load_delta_index(export_path)
+    with sinks.DeltaSink(os.path.join(export_path, "run2_Walls"), HEADER, index["categories"]["Walls"]["hashes"]) as sink:
+        sink.write_rows(second_rows)
+    assert sink.manifest_entry()["counts"] == {"rows": 10, "added": 2, "modified": 3, "deleted": 2}
+    assert sinks.read_csv(os.path.join(export_path, "run2_Walls_deleted.csv"))[1] == [["g0"], ["g1"]]
+    write_run(export_path, "run2", first_manifest, "Walls", sink)
+
+    header, rows = sinks.read_csv(sinks.reconstruct(export_path, "Walls", out_path=str(tmp_path / "latest.csv")))
+    assert header == HEADER
+    assert sorted(tuple(row) for row in rows) == sorted(second_rows)
+    header, rows = sinks.read_csv(sinks.reconstruct(
+        export_path, "Walls", out_path=str(tmp_path / "first.csv"), manifest_name=first_manifest))
+    assert [tuple(row) for row in rows] == first_rows
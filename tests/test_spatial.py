@@ -0,0 +1,52 @@
+"""
+Compares the rph.spatial SpatialIndex against brute force
+on random six float tuples, runs on plain CPython without Revit:
+
+    python -m pytest tests
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "RevitPythonHelper.lib"))
+
+from rph.spatial import SpatialIndex, box_distance
+
+from boxes import TOLERANCES, brute_contained, brute_overlapping, random_boxes
+
+
+def test_overlapping_matches_brute_force():
+    boxes = random_boxes(300, seed=1)
+    index = SpatialIndex(enumerate(boxes))
+    for query in random_boxes(50, seed=2, size=12):
+        for tolerance in TOLERANCES:
+            assert index.overlapping(query, tolerance) == brute_overlapping(boxes, query, tolerance)
+
+
+def test_contained_matches_brute_force():
+    boxes = random_boxes(300, seed=3)
+    index = SpatialIndex(enumerate(boxes))
+    for query in random_boxes(50, seed=4, size=20):
+        for tolerance in TOLERANCES:
+            assert index.contained(query, tolerance) == brute_contained(boxes, query, tolerance)
+
+
+def test_oversized_boxes_are_found():
+    boxes = random_boxes(100, seed=5) + [(-100.0, -100.0, -100.0, 100.0, 100.0, 100.0)]
+    index = SpatialIndex(enumerate(boxes), cell_size=4.0)
+    assert index.oversized == [len(boxes) - 1]
+    for query in random_boxes(20, seed=6):
+        assert index.overlapping(query) == brute_overlapping(boxes, query, 0.0)
+
+
+def test_nearest_matches_brute_force():
+    boxes = random_boxes(200, seed=7)
+    index = SpatialIndex(enumerate(boxes))
+    rnd = random.Random(8)
+    for _ in range(30):
+        point = (rnd.uniform(-20, 60), rnd.uniform(-20, 60), rnd.uniform(-5, 15))
+        expected = sorted((box_distance(point + point, box), idx) for idx, box in enumerate(boxes))
+        for k in (1, 5):
+            assert index.nearest(point, k=k) == expected[:k]
+        within = [(distance, idx) for distance, idx in expected if distance <= 3.0]
+        assert index.nearest(point, k=len(boxes), max_distance=3.0) == within